@@ -0,0 +1,278 @@
+from .UnitClass import ComplexUnits, dimsToUnits
+
+# Bulk Conversion of Raw Numbers
+# Unit strings are parsed and checked once up front, after which only a
+# single multiply is applied to each float, list or ndarray passed in.
+
+class Converter():
+    '''
+    Callable that scales raw numbers from one unit to another.
+    The factor is resolved through ComplexUnits.convertTo, so mismatched
+    dimensions raise UnitException when the converter is built.
+    '''
+    def __init__(self, topUnit = '', bottomUnit = '', newUnitTop = '', newUnitBottom = '', toSI = False, registry = None):
+        term = ComplexUnits(1, topUnit, bottomUnit, registry = registry)
+        if not toSI:
+            term.convertTo(newUnitTop, newUnitBottom, registry)
+
+        self.factor = term.scalar
+        self.dims = term.dims
+        return
+
+    def __call__(self, values, out = None):
+        if out is not None:
+            import numpy as np
+            return np.multiply(values, self.factor, out = out)
+
+        if type(values) in (list, tuple):
+            import numpy as np
+            return np.asarray(values, dtype = float) * self.factor
+
+        return values * self.factor
+
+
+def converter(topUnit = '', bottomUnit = '', to = 'SI', registry = None):
+    '''
+    topUnit, bottomUnit = units the raw numbers are given in
+    to= (newUnitTop, newUnitBottom) tuple, a single numerator string, or 'SI'
+    registry= UnitRegistry to resolve units with (defaults to the active one)
+
+    Example:
+        toSI = converter('lb*ft^2', 's^2', to = ('k_g*m^2', 's^2'))
+        joules = toSI(readings)            #floats, lists or ndarrays
+        toSI(readings, out = readings)     #in-place for float ndarrays
+    '''
+    if to == 'SI':
+        return Converter(topUnit, bottomUnit, toSI = True, registry = registry)
+
+    if type(to) == str:
+        to = (to, '')
+
+    return Converter(topUnit, bottomUnit, *to, registry = registry)
+
+
+# Streaming Conversion of Delimited Files
+# Headers carry their units in brackets, e.g. 'P [psi]' or 'flow [lbmol/h]'.
+# Each selected column gets one Converter; cells are parsed a chunk at a time.
+
+def splitUnits(units):
+    "Splits 'lbmol/h' or 'J/mol/K' into ('lbmol', 'h') and ('J', 'mol*K'). Spaces multiply; '' or '-' is unitless"
+    units = units.strip()
+    if units == '-':
+        units = ''
+    top, *bottom = ['*'.join(i.split()) for i in units.split('/')]
+    return top, '*'.join(bottom)
+
+
+def parseHeader(header):
+    "Splits a column header such as 'flow [lbmol/h]' into ('flow', 'lbmol', 'h'). Headers without units give (header, None, None)"
+    header = header.strip()
+    if not header.endswith(']') or header.find('[') == -1:
+        return header, None, None
+    start = header.rindex('[')
+    return (header[:start].strip(), *splitUnits(header[start + 1:-1]))
+
+
+def _unitsText(topUnit, bottomUnit):
+    "Writes [name, power] lists back as 'a*b^2/c'"
+    def side(units):
+        return '*'.join([name if power == 1 else f'{name}^{power:g}' for name, power in units])
+    top, bottom = side(topUnit), side(bottomUnit)
+    return f'{top}/{bottom}' if bottom else top
+
+
+def _columnConverter(header, target, registry):
+    "Returns the Converter and the rewritten header of one column"
+    name, topUnit, bottomUnit = parseHeader(header)
+    if topUnit is None:
+        raise ValueError(f'Column {header!r} has no [units] in its header')
+
+    if target == 'SI':
+        columnConverter = Converter(topUnit, bottomUnit, toSI = True, registry = registry)
+        return columnConverter, f'{name} [{_unitsText(*dimsToUnits(columnConverter.dims))}]'
+
+    if type(target) == str:
+        target = splitUnits(target)
+    columnConverter = Converter(topUnit, bottomUnit, *target, registry = registry)
+    return columnConverter, f'{name} [{target[0]}/{target[1]}]' if target[1] else f'{name} [{target[0]}]'
+
+
+def _convertColumn(chunk, column, columnConverter, name = None, firstRow = 1):
+    '''
+    Scales one column of a chunk of string rows in place. Blank cells stay blank; any other
+    non-numeric cell raises ValueError naming the column and its row number in the table.
+    name= column name for error messages
+    firstRow= row number of chunk[0], counting the header as row 1
+    '''
+    import numpy as np
+
+    cells = [row[column] for row in chunk]
+    try:
+        values = np.array(cells, dtype = float)
+        blanks = None
+    except ValueError:
+        blanks = [cell.strip() == '' for cell in cells]
+        values = np.zeros(len(cells))
+        for i, (cell, blank) in enumerate(zip(cells, blanks)):
+            if blank:
+                continue
+            try:
+                values[i] = float(cell)
+            except ValueError:
+                raise ValueError(f'Column {name if name is not None else column!r}, row {firstRow + i}: {cell!r} is not a number') from None
+
+    scaled = columnConverter(values, out = values).tolist()
+    if blanks is None:
+        for row, value in zip(chunk, scaled):
+            row[column] = repr(value)
+    else:
+        for row, value, blank in zip(chunk, scaled, blanks):
+            row[column] = '' if blank else repr(value)
+
+
+def streamColumns(rows, targets, chunkSize = 10000, registry = None):
+    '''
+    Generator converting unit-annotated columns of a table, chunkSize rows at a time.
+    rows= iterator of lists of strings whose first row is the header, e.g. a csv.reader
+    targets= {column: units} where column is the header name without its units (or the
+             whole header) and units is 'SI', a string such as 'kPa' or 'kmol/s', or a
+             (topUnit, bottomUnit) tuple. Other columns pass through unchanged
+    Yields the rewritten header row, then lists of up to chunkSize converted rows.
+    A non-numeric cell in a converted column (other than a blank) raises ValueError with its
+    column and row number, the header being row 1.
+    '''
+    from itertools import islice
+
+    rows = iter(rows)
+    header = list(next(rows))
+
+    names = {}
+    for i, cell in enumerate(header):
+        names[parseHeader(cell)[0]] = i
+        names[cell.strip()] = i
+
+    converters = []
+    for column, target in targets.items():
+        if column not in names:
+            raise KeyError(f'No column {column!r} in header {header}')
+        index = names[column]
+        columnConverter, header[index] = _columnConverter(header[index], target, registry)
+        converters.append((index, columnConverter, column))
+    yield header
+
+    #Row numbers count the header as row 1
+    firstRow = 2
+    while True:
+        chunk = [list(row) for row in islice(rows, chunkSize)]
+        if not chunk:
+            return
+        for index, columnConverter, column in converters:
+            _convertColumn(chunk, index, columnConverter, column, firstRow)
+        firstRow += len(chunk)
+        yield chunk
+
+
+def convertCSV(source, destination, targets, delimiter = None, chunkSize = 10000, registry = None):
+    '''
+    Converts unit-annotated columns of a CSV/TSV file, writing each chunk as it is converted
+    so memory stays bounded by chunkSize rows whatever the file size.
+    source, destination= paths or open text files
+    targets= {column: units}, see streamColumns
+    delimiter= field separator, defaults to a tab for .tsv/.tab paths and a comma otherwise
+    Returns the number of data rows written.
+
+    Example:
+        convertCSV('historian.csv', 'historian_SI.csv', {'P': 'kPa', 'T': 'K', 'flow': 'mol/s'})
+    '''
+    import csv
+    from contextlib import ExitStack
+
+    if delimiter is None:
+        path = source if type(source) == str else getattr(source, 'name', '')
+        delimiter = '\t' if str(path).lower().endswith(('.tsv', '.tab')) else ','
+
+    with ExitStack() as files:
+        if type(source) == str:
+            source = files.enter_context(open(source, newline = ''))
+        if type(destination) == str:
+            destination = files.enter_context(open(destination, 'w', newline = ''))
+
+        writer = csv.writer(destination, delimiter = delimiter)
+        chunks = streamColumns(csv.reader(source, delimiter = delimiter), targets, chunkSize, registry)
+        writer.writerow(next(chunks))
+        count = 0
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+# Parallel Conversion of Memory-Mapped Files
+# Workers reopen the file as their own np.memmap and scale one slice each,
+# so no process ever holds more than a chunk of the file in memory.
+
+def _scaleChunk(sourcePath, destinationPath, dtype, sourceOffset, destinationOffset, start, stop, factor):
+    import numpy as np
+
+    itemSize = np.dtype(dtype).itemsize
+    mode = 'r+' if destinationPath == sourcePath and destinationOffset == sourceOffset else 'r'
+    source = np.memmap(sourcePath, dtype = dtype, mode = mode, offset = sourceOffset + start * itemSize, shape = (stop - start,))
+    if mode == 'r+':
+        destination = source
+    else:
+        destination = np.memmap(destinationPath, dtype = dtype, mode = 'r+', offset = destinationOffset + start * itemSize, shape = (stop - start,))
+
+    np.multiply(source, factor, out = destination)
+    destination.flush()
+    del source, destination
+    return stop - start
+
+
+def convertMemmap(source, topUnit = '', bottomUnit = '', to = 'SI', destination = None, dtype = 'float64', offset = 0,
+                  chunkSize = 1 << 22, processes = None, registry = None):
+    '''
+    Scales every value of a raw binary array file by one unit factor, chunk by chunk across a process pool.
+    source= path to a raw file or an np.memmap (its file, dtype and offset are used)
+    topUnit, bottomUnit, to= units as for converter(); the factor is resolved once, up front
+    destination= output path, created with the source's size, or None (or the source's own path) to convert in place
+    dtype, offset= element type and header bytes to skip when source is a path
+    chunkSize= values per task
+    processes= worker count, None for one per core and 1 to convert in this process
+    Returns the converted data as a read-only np.memmap.
+
+    Example:
+        convertMemmap('dump.f64', 'g', 'cm*s^2', to = 'Pa')     #CGS pressure (dyn/cm^2) to SI, in place
+    '''
+    import os
+    import numpy as np
+
+    if isinstance(source, np.memmap):
+        dtype, offset, source = source.dtype, source.offset, source.filename
+
+    dtype = np.dtype(dtype)
+    count = (os.path.getsize(source) - offset) // dtype.itemsize
+    if count <= 0:
+        raise ValueError(f'{source} holds no {dtype} values after offset {offset}')
+    factor = converter(topUnit, bottomUnit, to, registry).factor
+
+    destinationOffset = offset
+    if destination is None or os.path.realpath(destination) == os.path.realpath(source):
+        #Opening the source itself with 'w+' would truncate it
+        destination = source
+    else:
+        destinationOffset = 0
+        np.memmap(destination, dtype = dtype, mode = 'w+', shape = (count,)).flush()
+
+    tasks = [(source, destination, dtype.str, offset, destinationOffset, start, min(start + chunkSize, count), factor)
+             for start in range(0, count, chunkSize)]
+
+    if processes == 1 or len(tasks) <= 1:
+        for task in tasks:
+            _scaleChunk(*task)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers = processes) as pool:
+            for future in [pool.submit(_scaleChunk, *task) for task in tasks]:
+                future.result()
+
+    return np.memmap(destination, dtype = dtype, mode = 'r', offset = destinationOffset, shape = (count,))
@@ -1,5 +1,7 @@
-import numpy             as np
-import matplotlib.pyplot as plt
+import threading as _threading
+from contextlib import contextmanager as _contextmanager
+from contextvars import ContextVar as _ContextVar
+from functools import lru_cache as _lru_cache, partial as _partial
 
 # # ChE Essentials 
 # ## Ideas to Implement
@@ -26,81 +28,233 @@ SI = {'Mass':'k_g', 'time':'s', 'Length':'m', 'Pressure':'Pa', 'Force':'N', 'Ene
 SITop = {'k_g':'k_g', 's':'s', 'm':'m', 'Pa':'k_g',      'N':'k_g*m', 'J':'k_g*m^2', 'W':'k_g*m^2', "m^3":'m^3',    'K':'K',    'mol':'mol'}
 SIBottom = {'k_g':'', 's':'',  'm':'',  'Pa':'m*s^2',    'N':'s^2',   'J':'s^2',     'W':'s^3',     "m^3":'',       'K':'',     'mol':''}
 
-UnitType = {'m^3':'Vol'}
+#Base Dimensions of the Exponent Vector, Ordered as the Unit Lists Sort
+BaseUnits = ('K', 'k_g', 'm', 'mol', 's')
+Dimensionless = (0, 0, 0, 0, 0)
 
+#Exponents of BaseUnits Making Up the SI Unit of Each Type
+TypeDims = {'Mass':(0,1,0,0,0), 'time':(0,0,0,0,1), 'Length':(0,0,1,0,0), 'Pressure':(0,1,-1,0,-2), 'Force':(0,1,1,0,-2),
+            'Energy':(0,1,2,0,-2), 'Power':(0,1,2,0,-3), 'Vol':(0,0,3,0,0), 'Temp':(1,0,0,0,0), 'Mole':(0,0,0,1,0)}
 
+#Multiply to Convert From the Noted Unit of Each Type to SI
+NotedToSI = {'Mass':10**-3, 'time':1, 'Temp':1, 'Length':1, 'Pressure':1, 'Force':1, 'Energy':1, 'Power':1, 'Vol':10**-3, 'Mole':1}
+
+#Per-Type Scaling Tables Held by Each Registry, Keyed Here by Their Module Level Names
 #Divide to Convert to Noted Unit, Multiply to Convert Away From Noted Unit
-MassToGrams    = {}
-TimeToSec      = {}
-TempToKel      = {}
-LengToMeter   = {}
-PressureToPa   = {}
-ForceToNewton  = {}
-EnergyToJoule = {}
-PowerToWatt   = {}
-VolumeToLitre  = {'m^3':10**-3}
-MoleToMol      = {}
-
-
-def ConvertMass(Before, After):
-    if (UnitType[Before] !='Mass' or UnitType[After] != 'Mass'):
-        return 'Inconsistent Units'
-    else:
-        return MassToGrams[After] / MassToGrams[Before]
-
-def ConvertMole(Before, After):
-    if (UnitType[Before] !='Mole' or UnitType[After] != 'Mole'):
-        return 'Inconsistent Units'
-    else:
-        return MoleToMol[After] / MoleToMol[Before]
-
-def ConvertTime(Before, After):
-    if (UnitType[Before] !='time' or UnitType[After] != 'time'):
-        return 'Inconsistent Units'
-    else:
-        return TimeToSec[After] / TimeToSec[Before]
-
-def ConvertTemp(Before, After):
-    if (UnitType[Before] !='Temp' or UnitType[After] != 'Temp'):
-        return 'Inconsistent Units'
-    else:
-        return TempToKel[After] / TempToKel[Before]
-
-def ConvertLength(Before, After):
-    if (UnitType[Before] !='Length' or UnitType[After] !='Length'):
-        return 'Inconsistent Units'
-    else:
-        return LengToMeter[After] / LengToMeter[Before]
-
-def ConvertPressure(Before, After):
-    if (UnitType[Before] !='Pressure' or UnitType[After] !='Pressure'):
-        return 'Inconsistent Units'
-    else:
-        return PressureToPa[After] / PressureToPa[Before]
-
-def ConvertForce(Before, After):
-    if (UnitType[Before] !='Force' or UnitType[After] !='Force'):
-        return 'Inconsistent Units'
-    else:
-        return ForceToNewton[After] / ForceToNewton[Before]
-
-def ConvertEnergy(Before, After):
-    if (UnitType[Before] !='Energy' or UnitType[After] !='Energy'):
-        return 'Inconsistent Units'
-    else:
-        return EnergyToJoule[After] / EnergyToJoule[Before]
-
-def ConvertPower(Before, After):
-    if (UnitType[Before] !='Power' or UnitType[After] !='Power'):
-        return 'Inconsistent Units'
-    else:
-        return PowerToWatt[After] / PowerToWatt[Before]
-
-def ConvertVolume(Before, After):
-    if (UnitType[Before] !='Vol' or UnitType[After] !='Vol'):
-        return 'Inconsistent Units'
-    else:
-        return VolumeToLitre[After] / VolumeToLitre[Before]
-
-ConvertType = {'Mass':ConvertMass, 'time':ConvertTime, 'Temp':ConvertTemp, 'Length':ConvertLength,               'Pressure':ConvertPressure, 'Force':ConvertForce, 'Energy':ConvertEnergy, 'Power':ConvertPower,               'Vol':ConvertVolume, 'Mole':ConvertMole}
+ScalingTableNames = {'MassToGrams':'Mass', 'TimeToSec':'time', 'TempToKel':'Temp', 'LengToMeter':'Length', 'PressureToPa':'Pressure',
+                     'ForceToNewton':'Force', 'EnergyToJoule':'Energy', 'PowerToWatt':'Power', 'VolumeToLitre':'Vol', 'MoleToMol':'Mole'}
+
+ParseCacheSize = 1024
+
+
+def parseUnits(units):
+    "Splits a unit string such as 'k_g*m^2' into a list of [name, power] pairs"
+    if type(units) == list:
+        return [[i[0], i[1]] for i in units if i[0] != '']
+
+    unitList = list()
+    for i in units.split('*'):
+        if i == '':
+            continue
+        if i.find('^') == -1:
+            unitList.append([i, 1])
+        else:
+            unit, power = i.split('^')
+            unitList.append([unit, float(power)])
+    return unitList
+
+
+def resolveUnits(tokens, topUnit, bottomUnit):
+    "Returns the exponent vector of topUnit / bottomUnit and its factor to SI, using the tokens table"
+    dims = list(Dimensionless)
+    factor = 1
+
+    for sign, units in ((1, topUnit), (-1, bottomUnit)):
+        for name, power in parseUnits(units):
+            conversion, unitDims = tokens[name]
+            power *= sign
+            factor *= conversion**power
+            for i in range(len(dims)):
+                dims[i] += unitDims[i] * power
+
+    return tuple(dims), factor
+
+
+class RegistryState():
+    '''
+    One immutable version of a registry's tables and the unit string cache
+    built from them. Never modified after it is published.
+    '''
+    __slots__ = ('unitType', 'scalingByType', 'tokens', 'signature')
+
+    def __init__(self, unitType, scalingByType, tokens, cacheSize):
+        self.unitType = unitType
+        self.scalingByType = scalingByType
+        self.tokens = tokens
+        self.signature = _lru_cache(maxsize = cacheSize)(_partial(resolveUnits, tokens))
+
+
+class UnitRegistry():
+    '''
+    Owns a set of unit tables and the cache of resolved unit strings.
+
+    Readers take self.state once and never lock. Writers are serialized by
+    a lock, build a new RegistryState from copies of the tables and publish
+    it with a single assignment, so a parse in another thread always sees
+    one consistent version. fork() returns a registry sharing this one's
+    state until either side writes, e.g. for per-tenant custom units:
+
+        tenant = DefaultRegistry.fork()
+        tenant.registerUnit('furlong', 'Length', 1/201.168)
+        with tenant.use():
+            distance = UUU('furlong')
+    '''
+    def __init__(self, loader = None, cacheSize = ParseCacheSize):
+        self.lock = _threading.RLock()
+        self.loader = loader
+        self.cacheSize = cacheSize
+
+        scalingByType = {unitType:{} for unitType in TypeDims}
+        scalingByType['Vol']['m^3'] = 10**-3
+        self.state = RegistryState({'m^3':'Vol'}, scalingByType, {'m^3':(1, TypeDims['Vol'])}, cacheSize)
+
+    @property
+    def unitType(self):
+        return self.state.unitType
+
+    @property
+    def scalingByType(self):
+        return self.state.scalingByType
+
+    @property
+    def tokens(self):
+        return self.state.tokens
+
+    def load(self):
+        "Runs the loader once, filling the tables on first use. Safe to call from any thread"
+        with self.lock:
+            loader, self.loader = self.loader, None
+            if loader is None:
+                return
+            try:
+                loader(self)
+            except:
+                self.loader = loader
+                raise
+
+    def lookup(self, token):
+        "Returns (SI factor, exponent vector) of a unit token"
+        try:
+            return self.state.tokens[token]
+        except KeyError:
+            self.load()
+        return self.state.tokens[token]
+
+    def signature(self, topUnit, bottomUnit):
+        "Returns the cached (exponent vector, SI factor) of topUnit / bottomUnit unit strings"
+        try:
+            return self.state.signature(topUnit, bottomUnit)
+        except KeyError:
+            self.load()
+        return self.state.signature(topUnit, bottomUnit)
+
+    def resolve(self, topUnit, bottomUnit):
+        "Uncached signature, for unit lists which can't be cache keys"
+        try:
+            return resolveUnits(self.state.tokens, topUnit, bottomUnit)
+        except KeyError:
+            self.load()
+        return resolveUnits(self.state.tokens, topUnit, bottomUnit)
+
+    def registerUnits(self, units):
+        "Adds (unitName, unitType, conversionFactor) rows, precomputing the SI factor of every prefixed form"
+        with self.lock:
+            state = self.state
+            unitType = dict(state.unitType)
+            scalingByType = dict(state.scalingByType)
+            tokens = dict(state.tokens)
+
+            for unitName, newType, conversionFactor in units:
+                unitType[unitName] = newType
+                scalingByType[newType] = dict(scalingByType[newType])
+                scalingByType[newType][unitName] = conversionFactor
+
+                toSI = NotedToSI[newType] / conversionFactor
+                dims = TypeDims[newType]
+                for prefix, scale in UnitPrefix.items():
+                    token = prefix + '_' + unitName if prefix != '' else unitName
+                    tokens[token] = (toSI * scale, dims)
+
+            self.state = RegistryState(unitType, scalingByType, tokens, self.cacheSize)
+
+    def registerUnit(self, unitName, unitType, conversionFactor):
+        self.registerUnits([(unitName, unitType, conversionFactor)])
+
+    def loadTables(self, units, tokens):
+        "Publishes already resolved (unitName, unitType, conversionFactor) rows and TokenToSI entries"
+        with self.lock:
+            state = self.state
+            unitType = dict(state.unitType)
+            scalingByType = {i:dict(j) for i, j in state.scalingByType.items()}
+            for unitName, newType, conversionFactor in units:
+                unitType[unitName] = newType
+                scalingByType[newType][unitName] = conversionFactor
+            tokens = dict(state.tokens, **tokens)
+
+            self.state = RegistryState(unitType, scalingByType, tokens, self.cacheSize)
+
+    def fork(self):
+        "Returns a registry that starts from this one's tables; writes to either don't affect the other"
+        self.load()
+        child = UnitRegistry(cacheSize = self.cacheSize)
+        child.state = self.state
+        return child
+
+    def cacheInfo(self):
+        "Returns the hits, misses, maxsize and currsize of the unit string cache"
+        return self.state.signature.cache_info()
+
+    def clearCache(self):
+        self.state.signature.cache_clear()
+
+    @_contextmanager
+    def use(self):
+        "Makes this the registry unit strings are parsed with in the current thread or task"
+        token = _ActiveRegistry.set(self)
+        try:
+            yield self
+        finally:
+            _ActiveRegistry.reset(token)
+
+
+DefaultRegistry = UnitRegistry()
+_ActiveRegistry = _ContextVar('ActiveRegistry', default = DefaultRegistry)
+
+def activeRegistry():
+    "Returns the registry set by UnitRegistry.use(), or DefaultRegistry"
+    return _ActiveRegistry.get()
+
+
+# Module Level Access to DefaultRegistry
+
+def registerUnit(unitName, unitType, conversionFactor):
+    DefaultRegistry.registerUnit(unitName, unitType, conversionFactor)
+
+def loadTables(units, tokens):
+    DefaultRegistry.loadTables(units, tokens)
+
+def loadRegistry():
+    DefaultRegistry.load()
 
+def __getattr__(name):
+    "UnitType, ScalingByType, TokenToSI and the per-type tables read DefaultRegistry's current state"
+    state = DefaultRegistry.state
+    if name == 'UnitType':
+        return state.unitType
+    if name == 'ScalingByType':
+        return state.scalingByType
+    if name == 'TokenToSI':
+        return state.tokens
+    if name in ScalingTableNames:
+        return state.scalingByType[ScalingTableNames[name]]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,7 +6,11 @@ class myVars():
     '''
     A Class for using persistant variables through the use of an SQLite Database
     Change self.path below to be an absolute path found within your computer.
-    
+
+    One connection is opened on first use and kept for the life of the object.
+    The database runs in WAL mode so several processes can load it while
+    another writes, and bulk writes go through addMany/upsert as a single
+    transaction.
     '''
     def __init__(self):
         path = os.path.realpath(__file__)
@@ -16,75 +20,87 @@ class myVars():
         for i in path:
             self.path += '/'+i
 
-        try:
-            file = open(self.path)
-            file.close()
-        except IOError:
+        self.database = None
+        if not os.path.isfile(self.path):
             print("No Database Found. Generating New Database")
             self.__makeNewDatabase__()
 
 
     def __makeNewDatabase__(self):
-            database = sql.connect(self.path)
-            self.cursor = database.cursor()
-            self.cursor.execute("create table UnitVariables (UnitName text Primary Key,\
-                                                            UnitType text not null,\
-                                                            UnitValue real not null);")
-            database.commit()
-            database.close()
-    
-    
+        database = self.connect()
+        with database:
+            database.execute("create table if not exists UnitVariables (UnitName text Primary Key,\
+                                                                        UnitType text not null,\
+                                                                        UnitValue real not null);")
+
+
+    def connect(self):
+        "Returns the connection shared by every call on this object, opening it if needed"
+        if self.database is None:
+            self.database = sql.connect(self.path, check_same_thread = False)
+            try:
+                self.database.execute("PRAGMA journal_mode=WAL")
+            except sql.OperationalError:
+                #Read-only locations can't switch journal mode; plain reads still work
+                pass
+        return self.database
+
+
+    def close(self):
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+
+
+    def checkpoint(self):
+        "Folds the WAL back into units.db and truncates it, keeping the connection open"
+        if self.database is not None:
+            try:
+                self.database.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sql.OperationalError:
+                pass
+
+
     def loadUnitVariables(self):
-        database = sql.connect(self.path)
-        self.cursor = database.cursor()
-        self.cursor.execute("SELECT * FROM UnitVariables")
-        unitList = self.cursor.fetchall();
-        database.close()
-        return unitList
-    
-    
+        database = self.connect()
+        return database.execute("SELECT * FROM UnitVariables").fetchall()
+
+
     def add(self, UnitName, UnitType, UnitValue, OverrideExisting = False):
-        database = sql.connect(self.path)
-        varHolder = "(?,?,?)"
-        VarData = (UnitName, UnitType, UnitValue)
-    
-        try:
-            cursor = database.cursor()
-            cursor.execute(f"INSERT INTO UnitVariables VALUES {varHolder}", VarData)
-            database.commit()
-            database.close()
+        if OverrideExisting:
+            self.upsert([(UnitName, UnitType, UnitValue)])
             return
-    
-        except sql.IntegrityError:
-            if OverrideExisting:
-                try:
-                    self.remove(varName)
-                except:
-                    database.close()
-                    return
-                cursor = database.cursor()
-                cursor.execute(f"INSERT INTO UnitVariables VALUES {varHolder}", VarData)
-                database.commit()
-                database.close()
-                return
-    
-            else:
-                raise Error("Error: Does Unit type already exist? Try OverrideExisting Flag")
-                return
-    
-    
-    def remove(self, varName, database = None):
-        opened = False
-        if not database:
-            opened = True
-            database = sql.connect(self.path)
+
         try:
-            cursor = database.cursor()
-            cursor.execute(f"DELETE FROM UnitVariables WHERE VarName = ?", (varName,))
-            database.commit()
-            if opened:
-                database.close()
-        except:
-            if opened:
-                database.close()
+            self.addMany([(UnitName, UnitType, UnitValue)])
+        except sql.IntegrityError:
+            raise ValueError(f"Error: Does Unit {UnitName} already exist? Try OverrideExisting Flag")
+
+
+    def addMany(self, units):
+        '''
+        units = iterable of (UnitName, UnitType, UnitValue)
+        Inserts every unit in one transaction. If any unit already exists
+        nothing is written and sqlite3.IntegrityError is raised.
+        '''
+        database = self.connect()
+        with database:
+            database.executemany("INSERT INTO UnitVariables VALUES (?,?,?)", units)
+
+
+    def upsert(self, units):
+        '''
+        units = iterable of (UnitName, UnitType, UnitValue)
+        Inserts new units and overwrites existing ones in one transaction.
+        '''
+        database = self.connect()
+        with database:
+            database.executemany("INSERT OR REPLACE INTO UnitVariables VALUES (?,?,?)", units)
+
+
+    def remove(self, varName):
+        database = self.connect()
+        with database:
+            cursor = database.execute("DELETE FROM UnitVariables WHERE UnitName = ?", (varName,))
+        if cursor.rowcount == 0:
             print(f"{varName} could not be found")
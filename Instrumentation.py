@@ -0,0 +1,195 @@
+'''
+Opt-in counters and timers for the hot paths of the package.
+
+Nothing is wrapped until instrumentation is enabled, so the disabled cost is
+zero: enable() swaps counting wrappers in for the functions below and
+disable() puts the originals back.
+
+    parsedConstructions   ComplexUnits/UUU built from unit strings
+    derivedConstructions  quantities built by arithmetic (fromDims)
+    convertToSI           unit strings scaled to SI
+    convertTo             display unit conversions
+    Unit                  UnitClass.Unit calls
+    parseHit / parseMiss  unit string signature cache hits and misses
+    UnitException         unit errors raised
+
+Each entry holds a call count and the inclusive seconds spent in it.
+Unit is counted when called through the UnitClass module; a name imported
+before enable() keeps pointing at the unwrapped function.
+
+Usage:
+    with instrument() as stats:
+        simulate()
+    print(stats)
+
+or set UNITANALYSIS_INSTRUMENT=1 before import, and optionally
+UNITANALYSIS_INSTRUMENT_LOG=<seconds> for a periodic log line on this module's logger.
+'''
+import logging as _logging
+import os as _os
+import threading as _threading
+from contextlib import contextmanager as _contextmanager
+from functools import wraps as _wraps
+from time import perf_counter as _perf_counter
+
+from . import UnitClass as _UnitClass
+from .ConversionTools import UnitRegistry as _UnitRegistry
+
+logger = _logging.getLogger(__name__)
+
+_lock = _threading.Lock()
+_stateLock = _threading.RLock()
+_counts = {}
+_seconds = {}
+_originals = []
+_depth = 0
+_logStop = None
+
+
+def _record(name, elapsed):
+    with _lock:
+        _counts[name] = _counts.get(name, 0) + 1
+        _seconds[name] = _seconds.get(name, 0.0) + elapsed
+
+
+def _timed(name, function):
+    @_wraps(function)
+    def wrapper(*args, **kwargs):
+        start = _perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record(name, _perf_counter() - start)
+    return wrapper
+
+
+def _timedSignature(function):
+    "Wraps UnitRegistry.signature, telling cache hits from misses by the cache's miss count"
+    @_wraps(function)
+    def wrapper(self, topUnit, bottomUnit):
+        cache = self.state.signature
+        misses = cache.cache_info().misses
+        start = _perf_counter()
+        try:
+            return function(self, topUnit, bottomUnit)
+        finally:
+            elapsed = _perf_counter() - start
+            missed = self.state.signature is not cache or cache.cache_info().misses != misses
+            _record('parseMiss' if missed else 'parseHit', elapsed)
+    return wrapper
+
+
+def _targets():
+    "(owner, attribute, wrapper factory) of every instrumented function"
+    ComplexUnits = _UnitClass.ComplexUnits
+    return [(ComplexUnits, '__init__', lambda f: _timed('parsedConstructions', f)),
+            (ComplexUnits, 'fromDims', lambda f: _timed('derivedConstructions', f)),
+            (ComplexUnits, 'convertToSI', lambda f: _timed('convertToSI', f)),
+            (ComplexUnits, 'convertTo', lambda f: _timed('convertTo', f)),
+            (_UnitClass, 'Unit', lambda f: _timed('Unit', f)),
+            (_UnitClass.UnitException, '__init__', lambda f: _timed('UnitException', f)),
+            (_UnitRegistry, 'signature', _timedSignature)]
+
+
+def _patch():
+    for owner, name, wrap in _targets():
+        original = vars(owner)[name]
+        if isinstance(original, classmethod):
+            replacement = classmethod(wrap(original.__func__))
+        else:
+            replacement = wrap(original)
+        _originals.append((owner, name, original))
+        setattr(owner, name, replacement)
+
+
+def _unpatch():
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+
+
+def _logLoop(every, stop):
+    while not stop.wait(every):
+        logger.info(formatLine(snapshot()))
+
+
+def isEnabled():
+    return _depth > 0
+
+
+def enable(logEvery = None):
+    '''
+    Starts counting. Calls nest; counting stops once every enable has a matching disable.
+    logEvery= seconds between log lines on this module's logger, None for no logging
+    '''
+    global _depth, _logStop
+    with _stateLock:
+        if _depth == 0:
+            _patch()
+        _depth += 1
+        if logEvery and _logStop is None:
+            _logStop = _threading.Event()
+            _threading.Thread(target = _logLoop, args = (logEvery, _logStop), daemon = True,
+                              name = 'UnitAnalysis instrumentation').start()
+
+
+def disable():
+    global _depth, _logStop
+    with _stateLock:
+        if _depth == 0:
+            return
+        _depth -= 1
+        if _depth == 0:
+            _unpatch()
+            if _logStop is not None:
+                _logStop.set()
+                _logStop = None
+
+
+def reset():
+    with _lock:
+        _counts.clear()
+        _seconds.clear()
+
+
+def snapshot():
+    "Returns {name: {'count': calls, 'seconds': inclusive time}} of everything counted since the last reset"
+    with _lock:
+        return {name: {'count': _counts[name], 'seconds': _seconds[name]} for name in sorted(_counts)}
+
+
+def formatLine(stats):
+    "One log line of counts and milliseconds, e.g. 'parsedConstructions=120 (0.41ms) ...'"
+    if not stats:
+        return 'no unit operations recorded'
+    return ' '.join(f"{name}={entry['count']} ({entry['seconds']*1000:.2f}ms)" for name, entry in stats.items())
+
+
+@_contextmanager
+def instrument(logEvery = None):
+    '''
+    Counts unit operations inside the block. Yields a dict that is filled
+    with the counts and seconds of the block (in the snapshot() format) on exit.
+    logEvery= seconds between log lines while the block runs
+    '''
+    stats = {}
+    enable(logEvery)
+    before = snapshot()
+    try:
+        yield stats
+    finally:
+        after = snapshot()
+        disable()
+        for name, entry in after.items():
+            previous = before.get(name, {'count': 0, 'seconds': 0.0})
+            if entry['count'] != previous['count']:
+                stats[name] = {'count': entry['count'] - previous['count'],
+                               'seconds': entry['seconds'] - previous['seconds']}
+
+
+def enableFromEnvironment():
+    "Enables instrumentation when UNITANALYSIS_INSTRUMENT is set to anything but 0/false/no"
+    if _os.environ.get('UNITANALYSIS_INSTRUMENT', '').strip().lower() in ('', '0', 'false', 'no'):
+        return
+    logEvery = _os.environ.get('UNITANALYSIS_INSTRUMENT_LOG')
+    enable(float(logEvery) if logEvery else None)
@@ -0,0 +1,291 @@
+from functools import lru_cache as _lru_cache
+
+from .ConversionTools import Dimensionless
+from .UnitClass import UUU, ComplexUnits, UnitException, dimsToUnits, shareDims
+
+# Deferred Arithmetic
+# lazy(x) wraps a quantity so that + - * / ** and negation record an
+# expression tree instead of computing. The tree is evaluated the first
+# time its value is needed (getNum, prettyPrint, convertTo, float, NumPy).
+# Evaluation walks the tree once to collect the SI payload of every input
+# and a structure key (the operators, the exponents and each input's
+# exponent vector). The key is compiled once, with its result units, into
+# a generated function (or a numexpr expression for large arrays), so
+# evaluating the same correlation again over new inputs does no unit
+# bookkeeping at all.
+#
+#     T, P = lazy(T), lazy(P)
+#     Z = 1 + B * P / (R * T) + C * (P / (R * T))**2     #nothing computed yet
+#     print(Z)                                            #one fused evaluation
+
+CompiledCacheSize = 512
+
+#numexpr (optional) is used for array inputs at least this large
+NumexprMinSize = 1 << 15
+
+_DeferredUfuncs = {'add': 'add', 'subtract': 'sub', 'multiply': 'mul', 'divide': 'div', 'true_divide': 'div',
+                   'negative': 'neg'}
+
+_Symbols = {'add': '+', 'sub': '-', 'mul': '*', 'div': '/'}
+
+
+class LazyU(UUU):
+    '''
+    A UUU whose value is an unevaluated expression tree.
+    node is (operator, left, right) with operands being LazyU, UUU or plain
+    numbers; ('pow', base, exponent) and ('neg', operand, None) cover the rest.
+    scalar, dims and units evaluate the tree on first access, so every UUU
+    method works on a LazyU; arithmetic on a LazyU stays deferred.
+    '''
+    __slots__ = ('node', '_value')
+
+    def __init__(self, node):
+        self.node = node
+        self._value = None
+
+    @classmethod
+    def fromDims(cls, num, dims, units = None):
+        return UUU.fromDims(num, dims, units)
+
+    def evaluate(self):
+        "Computes the tree once and returns the resulting UUU, in SI"
+        if self._value is None:
+            inputs = []
+            key = _structure(self, inputs)
+            dims, function = _compile(key)
+            self._value = UUU.fromDims(function(*inputs), dims)
+            self.node = None
+        return self._value
+
+    @property
+    def scalar(self):
+        return self.evaluate().scalar
+
+    @property
+    def dims(self):
+        return self.evaluate().dims
+
+    @property
+    def units(self):
+        return self.evaluate().units
+
+    def convertTo(self, newUnitTop = '', newUnitBottom = '', registry = None):
+        self.evaluate().convertTo(newUnitTop, newUnitBottom, registry)
+        return self
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        "Defers the ufuncs behind + - * / and negation (e.g. ndarray * LazyU); others evaluate"
+        operator = _DeferredUfuncs.get(ufunc.__name__)
+        if method != '__call__' or kwargs or operator is None:
+            return UUU.__array_ufunc__(self, ufunc, method, *inputs, **kwargs)
+        if operator == 'neg':
+            return -inputs[0]
+        return LazyU((operator, *inputs))
+
+    def __add__(self, other):
+        return LazyU(('add', self, other))
+
+    def __radd__(self, other):
+        return LazyU(('add', other, self))
+
+    def __sub__(self, other):
+        return LazyU(('sub', self, other))
+
+    def __rsub__(self, other):
+        return LazyU(('sub', other, self))
+
+    def __mul__(self, other):
+        return LazyU(('mul', self, other))
+
+    def __rmul__(self, other):
+        return LazyU(('mul', other, self))
+
+    def __truediv__(self, other):
+        return LazyU(('div', self, other))
+
+    def __rtruediv__(self, other):
+        return LazyU(('div', other, self))
+
+    def __pow__(self, other):
+        if isinstance(other, ComplexUnits):
+            if other.dims != Dimensionless:
+                raise UnitException('Power', f'{other.topUnit} / {other.bottomUnit}', 'dimensionless')
+            other = other.siScalar()
+        return LazyU(('pow', self, float(other)))
+
+    def __neg__(self):
+        return LazyU(('neg', self, None))
+
+
+def lazy(value):
+    "Wraps a UUU (or number) so arithmetic on it is deferred and fused, see LazyU"
+    if isinstance(value, LazyU):
+        return value
+    return LazyU(('leaf', value, None))
+
+
+def _pending(operand):
+    "Returns the node of an unevaluated LazyU (looking through lazy() leaves), else None"
+    while isinstance(operand, LazyU) and operand._value is None:
+        if operand.node[0] != 'leaf':
+            return operand.node
+        operand = operand.node[1]
+    return None
+
+
+def _chain(node):
+    "Operands of a run of the same associative operator, left to right, e.g. a + b + c + d"
+    operator = node[0]
+    operands = []
+    pending = [node[2], node[1]]
+    while pending:
+        operand = pending.pop()
+        inner = _pending(operand)
+        if inner is not None and inner[0] == operator:
+            pending += [inner[2], inner[1]]
+        else:
+            operands.append(operand)
+    return operands
+
+
+def _structure(root, inputs):
+    '''
+    Returns the structure key of root, appending the SI payload of each input to inputs.
+    The key is flat: the tree in postfix order, with ('in', dims) for each input and
+    (operator, operand count) or ('pow', exponent) for each operation. Runs of + or *
+    become one n-ary operation, and the walk uses an explicit stack, so long chains
+    hit neither the recursion limit nor deep nesting.
+    '''
+    key = []
+    stack = [(root, None)]
+    while stack:
+        operand, token = stack.pop()
+        if token is not None:
+            key.append(token)
+            continue
+
+        node = _pending(operand)
+        if node is None:
+            if isinstance(operand, LazyU):
+                operand = operand._value if operand._value is not None else operand.node[1]
+            if isinstance(operand, ComplexUnits):
+                inputs.append(operand.siScalar())
+                key.append(('in', operand.dims))
+            else:
+                inputs.append(operand)
+                key.append(('in', None))
+            continue
+
+        operator, left, right = node
+        if operator in ('add', 'mul'):
+            operands = _chain(node)
+            token = (operator, len(operands))
+        elif operator in ('pow', 'neg'):
+            operands = [left]
+            token = ('pow', right) if operator == 'pow' else ('neg', 1)
+        else:
+            operands = [left, right]
+            token = (operator, 2)
+
+        stack.append((None, token))
+        stack += [(i, None) for i in reversed(operands)]
+    return tuple(key)
+
+
+def _unitText(dims):
+    topUnit, bottomUnit = dimsToUnits(dims)
+    return f'{topUnit} / {bottomUnit}'
+
+
+#Expressions nested deeper than this are evaluated statement by statement instead of through numexpr
+NumexprMaxDepth = 32
+
+
+@_lru_cache(maxsize = CompiledCacheSize)
+def _compile(key):
+    '''
+    Returns (result exponent vector, function of the input payloads) for a structure key.
+    The function is generated as one assignment per operation, with exponents bound as
+    constants rather than written into the source.
+    '''
+    names = []
+    constants = {}
+    lines = []
+    #Entries of (variable, dims, numexpr expression, depth)
+    stack = []
+
+    for token in key:
+        operator = token[0]
+        if operator == 'in':
+            name = f'v{len(names)}'
+            names.append(name)
+            stack.append((name, token[1] if token[1] != None else Dimensionless, name, 0))
+            continue
+
+        target = f't{len(lines)}'
+        if operator == 'pow':
+            exponent = token[1]
+            name, dims, expression, depth = stack.pop()
+            if dims != Dimensionless and not (exponent - exponent == 0):
+                raise UnitException('Power', _unitText(dims), 'a finite exponent')
+            constant = f'e{len(constants)}'
+            constants[constant] = exponent
+            lines.append(f'{target} = {name} ** {constant}')
+            stack.append((target, tuple([i * exponent if i else 0 for i in dims]), f'({expression} ** {constant})', depth + 1))
+            continue
+
+        if operator == 'neg':
+            name, dims, expression, depth = stack.pop()
+            lines.append(f'{target} = -{name}')
+            stack.append((target, dims, f'(-{expression})', depth + 1))
+            continue
+
+        operands = stack[-token[1]:]
+        del stack[-token[1]:]
+        dims = operands[0][1]
+        for i in operands[1:]:
+            if operator in ('add', 'sub'):
+                if i[1] != dims:
+                    raise UnitException('Addition' if operator == 'add' else 'Subtraction', _unitText(dims), _unitText(i[1]))
+            elif operator == 'mul':
+                dims = tuple([j + k for j, k in zip(dims, i[1])])
+            else:
+                dims = tuple([j - k for j, k in zip(dims, i[1])])
+
+        symbol = _Symbols[operator]
+        lines.append(f'{target} = {operands[0][0]} {symbol} {operands[1][0]}')
+        lines += [f'{target} = {target} {symbol} {i[0]}' for i in operands[2:]]
+        expression = '(' + f' {symbol} '.join([i[2] for i in operands]) + ')'
+        stack.append((target, dims, expression, max([i[3] for i in operands]) + 1))
+
+    result, dims, expression, depth = stack.pop()
+    source = f'def compiled({", ".join(names)}):\n' + ''.join([f'    {i}\n' for i in lines]) + f'    return {result}\n'
+    namespace = dict(constants)
+    exec(source, namespace)
+    function = namespace['compiled']
+    if depth <= NumexprMaxDepth:
+        function = _numexprFallback(expression, names, constants, function)
+    return shareDims(dims), function
+
+
+def _numexprFallback(expression, names, constants, function):
+    "Runs large array inputs through numexpr when it is installed, otherwise the compiled Python function"
+    try:
+        import numexpr
+    except ImportError:
+        return function
+
+    def evaluate(*inputs):
+        if max([getattr(i, 'size', 1) for i in inputs]) < NumexprMinSize:
+            return function(*inputs)
+        return numexpr.evaluate(expression, local_dict = dict(zip(names, inputs), **constants))
+    return evaluate
+
+
+def compiledCacheInfo():
+    "Returns the hits, misses, maxsize and currsize of the compiled expression cache"
+    return _compile.cache_info()
+
+
+def clearCompiledCache():
+    _compile.cache_clear()
@@ -0,0 +1,79 @@
+import marshal
+import os
+import sys
+
+# Precompiled Unit Registry
+# The resolved tables (every unit with its type and value, and every
+# prefixed token with its SI factor and exponent vector) are written next
+# to units.db so startup is one file read instead of a sqlite query and
+# ~1200 registerUnit entries. The snapshot records the mtime and size of
+# units.db and its WAL file and is ignored as stale when they change.
+#
+# Build step (e.g. while building a read-only container image):
+#     python -m UnitAnalysis.RegistrySnapshot
+
+SnapshotVersion = 1
+
+
+def sourceStamp(dataPath):
+    "Identifies the current state of units.db and its WAL file by mtime and size"
+    stamp = []
+    for path in (dataPath, dataPath + '-wal'):
+        try:
+            info = os.stat(path)
+            stamp.append((info.st_mtime_ns, info.st_size))
+        except OSError:
+            stamp.append(None)
+
+    #An empty WAL (checkpointed, or deleted when the last connection closed) holds no changes
+    if stamp[1] != None and stamp[1][1] == 0:
+        stamp[1] = None
+    return tuple(stamp)
+
+
+def readSnapshot(snapshotPath, dataPath):
+    '''
+    Returns (units, tokens) stored in the snapshot, or None when it is
+    missing, unreadable, written by another Python/format version, or
+    older than units.db. With no units.db at all the snapshot is trusted.
+    '''
+    try:
+        with open(snapshotPath, 'rb') as file:
+            data = marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if type(data) != dict or data.get('version') != (SnapshotVersion, tuple(sys.version_info[:2])):
+        return None
+
+    stamp = sourceStamp(dataPath)
+    if stamp[0] is not None and data['stamp'] != stamp:
+        return None
+
+    return data['units'], data['tokens']
+
+
+def writeSnapshot(snapshotPath, dataPath, units, tokens):
+    "Atomically replaces the snapshot. Returns False if the location isn't writable"
+    data = {'version': (SnapshotVersion, tuple(sys.version_info[:2])),
+            'stamp': sourceStamp(dataPath),
+            'units': [tuple(unit) for unit in units],
+            'tokens': dict(tokens)}
+
+    tempPath = f'{snapshotPath}.{os.getpid()}.tmp'
+    try:
+        with open(tempPath, 'wb') as file:
+            file.write(marshal.dumps(data))
+        os.replace(tempPath, snapshotPath)
+    except OSError:
+        try:
+            os.remove(tempPath)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    from . import BuildSnapshot
+    print(BuildSnapshot())
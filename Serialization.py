@@ -0,0 +1,147 @@
+import json
+import numpy as np
+from numbers import Number
+
+from .ConversionTools import BaseUnits
+from .UnitClass import ComplexUnits, UUU, shareDims
+
+# Binary Files for Quantities
+# A file holds one quantity or a dict of named quantities: a JSON header
+# with the canonical unit signature of each entry (exponents over BaseUnits
+# and, after convertTo, the display units record) followed by the raw
+# ndarray payloads, each aligned to 64 bytes so loadU can memory map them
+# in place. Paths ending in .npz are written with np.savez instead, which
+# compresses but can't be memory mapped.
+#
+#     saveU('state.qty', {'P': pressures, 'T': temperatures})
+#     state = loadU('state.qty')          #P and T wrap read-only np.memmaps
+
+Magic = b'UNITANALYSIS-QTY\n'
+FormatVersion = 1
+_Alignment = 64
+_SignatureKey = '__signatures__'
+
+
+def signatureOf(value):
+    "Returns the canonical JSON-ready signature of a quantity, or None for plain numbers"
+    if not isinstance(value, ComplexUnits):
+        return None
+    units = None
+    if value.units != None:
+        factor, topUnit, bottomUnit = value.units
+        units = [factor, [list(i) for i in topUnit], [list(i) for i in bottomUnit]]
+    return {'dims': list(value.dims), 'units': units}
+
+
+def fromSignature(payload, signature):
+    "Rebuilds a quantity around payload from a signature written by signatureOf"
+    if signature is None:
+        return payload
+    units = signature['units']
+    if units is not None:
+        units = (units[0], tuple([tuple(i) for i in units[1]]), tuple([tuple(i) for i in units[2]]))
+    return UUU.fromDims(payload, shareDims(tuple(signature['dims'])), units)
+
+
+def _aligned(position):
+    return -(-position // _Alignment) * _Alignment
+
+
+def _entries(values):
+    "Returns ({name: value}, single) for one quantity or a dict of them"
+    if isinstance(values, dict):
+        return values, False
+    return {'': values}, True
+
+
+def _payload(value):
+    if not isinstance(value, (ComplexUnits, np.ndarray, Number, np.generic)):
+        raise TypeError(f'Cannot save a {type(value).__name__}; pass a UUU, ndarray or number (or a dict of them)')
+    payload = np.asarray(value.scalar if isinstance(value, ComplexUnits) else value, order = 'C')
+    if payload.dtype.hasobject:
+        raise ValueError('Only numeric payloads can be saved')
+    return payload
+
+
+def _checkBase(base, path):
+    if tuple(base) != BaseUnits:
+        raise ValueError(f'{path} was written for base units {base}, not {list(BaseUnits)}')
+
+
+def saveU(path, values):
+    '''
+    Writes a UUU (scalar or ndarray backed), a plain number/ndarray, or a dict of them.
+    path= file path; a .npz suffix writes a compressed npz instead of the memory-mappable format
+    '''
+    entries, single = _entries(values)
+    payloads = {name: _payload(value) for name, value in entries.items()}
+    header = {'version': FormatVersion, 'base': list(BaseUnits), 'single': single,
+              'entries': {name: {'signature': signatureOf(value)} for name, value in entries.items()}}
+
+    if str(path).endswith('.npz'):
+        header['names'] = list(payloads)
+        arrays = {f'v{i}': payload for i, payload in enumerate(payloads.values())}
+        np.savez_compressed(path, **arrays, **{_SignatureKey: np.array(json.dumps(header))})
+        return
+
+    #Offsets count from the start of the data, which begins at the first aligned byte after the header
+    offset = 0
+    for name, payload in payloads.items():
+        header['entries'][name].update({'dtype': payload.dtype.str, 'shape': list(payload.shape), 'offset': offset})
+        offset = _aligned(offset + payload.nbytes)
+    text = json.dumps(header, separators = (',', ':')).encode()
+    start = _aligned(len(Magic) + 8 + len(text))
+
+    with open(path, 'wb') as file:
+        file.write(Magic)
+        file.write(len(text).to_bytes(8, 'little'))
+        file.write(text)
+        for name, payload in payloads.items():
+            file.seek(start + header['entries'][name]['offset'])
+            file.write(payload.tobytes())
+        file.truncate()
+
+
+def loadU(path, mmapMode = 'r'):
+    '''
+    Reads a file written by saveU, returning what was saved (a quantity or a dict of them).
+    mmapMode= np.memmap mode for the payloads ('r', 'r+' or 'c'), None to read them into memory.
+              Memory-mapped payloads aren't copied; 0-d values and .npz files are always read
+    '''
+    with open(path, 'rb') as file:
+        magic = file.read(len(Magic))
+        if magic[:2] == b'PK':
+            return _loadNpz(path)
+        if magic != Magic:
+            raise ValueError(f'{path} is not a saveU file')
+        length = int.from_bytes(file.read(8), 'little')
+        header = json.loads(file.read(length))
+        start = _aligned(len(Magic) + 8 + length)
+
+        if header['version'] > FormatVersion:
+            raise ValueError(f'{path} uses format version {header["version"]}, newer than {FormatVersion}')
+        _checkBase(header['base'], path)
+
+        values = {}
+        for name, entry in header['entries'].items():
+            dtype, shape = np.dtype(entry['dtype']), tuple(entry['shape'])
+            if mmapMode is None or shape == () or 0 in shape:
+                file.seek(start + entry['offset'])
+                payload = np.fromfile(file, dtype = dtype, count = int(np.prod(shape))).reshape(shape)
+                payload = payload[()] if shape == () else payload
+            else:
+                payload = np.memmap(path, dtype = dtype, mode = mmapMode, offset = start + entry['offset'], shape = shape)
+            values[name] = fromSignature(payload, entry['signature'])
+
+    return values[''] if header['single'] else values
+
+
+def _loadNpz(path):
+    with np.load(path, allow_pickle = False) as data:
+        header = json.loads(str(data[_SignatureKey]))
+        _checkBase(header['base'], path)
+        values = {}
+        for i, name in enumerate(header['names']):
+            payload = data[f'v{i}']
+            values[name] = fromSignature(payload[()] if payload.shape == () else payload, header['entries'][name]['signature'])
+    return values[''] if header['single'] else values
@@ -1,537 +1,559 @@
 from .ConversionTools import *
-def Unit(Before, After = 'SI', returnUnits = False):    
-    preBefore = ''
-    preAfter  = ''
-    returnUnitsTwo = False
-    
-    #Process with Before Prefix
-    if Before.find('_') != -1:
-        preBefore, Before = Before.split('_')
-    
-    #Define After for SI default
+from .ConversionTools import activeRegistry
+from functools import lru_cache as _lru_cache
+
+def lookupToken(token, registry = None):
+    "Returns (SI factor, exponent vector) of a unit token, loading the unit tables on first use"
+    return (registry or activeRegistry()).lookup(token)
+
+
+def Unit(Before, After = 'SI', returnUnits = False, registry = None):
+    registry = registry or activeRegistry()
+    conversion, dims = registry.lookup(Before)
+
+    #Returns Numerical Answer and Units Parsed Into Base Units
     if After == 'SI':
-        After = SI[UnitType[Before]]
-        returnUnitsTwo = True
-    
-    #Process with After Prefix
-    if After.find('_') != -1:
-        preAfter, After = After.split('_')
-    
+        if not returnUnits:
+            return conversion
+
+        if Before.find('_') != -1:
+            Before = Before.split('_')[1]
+        After = SI[registry.unitType[Before]]
+        return [conversion, SITop[After], SIBottom[After]]
+
     #Check Unit Consistency
-    if (UnitType[Before] != UnitType[After]):
-        return 'Inconsistent Units'
-    
-    #Returns Numerical Answer Depending on Unit Return Request
-    
-    #Returns Numerical Answer and Units Parsed Into Base Units
-    if (returnUnits and returnUnitsTwo): # or (Before == After):
-        numericalAns = ConvertType[UnitType[Before]](Before, After) * UnitPrefix[preBefore] / UnitPrefix[preAfter]
-        if preAfter != '':
-            preAfter += '_'
-        topUnits = SITop[(preAfter + After)]
-        bottomUnits = SIBottom[preAfter + After]
-        return [numericalAns, topUnits, bottomUnits]
-    
+    toAfter, afterDims = registry.lookup(After)
+    if dims != afterDims:
+        raise UnitException('Conversion', Before, After)
+
     #Returns Numerical Answer and After Units
-    elif returnUnits:
-        numericalAns = ConvertType[UnitType[Before]](Before, After) * UnitPrefix[preBefore] / UnitPrefix[preAfter]
-        return [numericalAns, After]
-    
+    if returnUnits:
+        if After.find('_') != -1:
+            After = After.split('_')[1]
+        return [conversion / toAfter, After]
+
     #Returns Numerical Answer
-    else:
-        return ConvertType[UnitType[Before]](Before, After) * UnitPrefix[preBefore] / UnitPrefix[preAfter]
+    return conversion / toAfter
 
 
 # ## Unit Exceptions
 
 class UnitException(Exception):
     def __init__(self, operation, unitOne, unitTwo):
+        super().__init__(f'{operation}: {unitOne} is inconsistent with {unitTwo}')
+        self.operation = operation
+        self.unitOne = unitOne
+        self.unitTwo = unitTwo
         return
 
 
 # ## Unit Analysis
 
+def dimsToUnits(dims):
+    "Returns the [name, power] lists of the numerator and denominator of an exponent vector"
+    topUnit = list()
+    bottomUnit = list()
+    for i in range(len(BaseUnits)):
+        power = dims[i]
+        if power == 0:
+            continue
+        if power % 1 == 0:
+            power = int(power)
+        if power > 0:
+            topUnit.append([BaseUnits[i], power])
+        else:
+            bottomUnit.append([BaseUnits[i], -power])
+    return topUnit, bottomUnit
+
+
+def unitSignature(topUnit, bottomUnit, registry = None):
+    "Cached (exponent vector, SI factor) of a (topUnit, bottomUnit) pair of unit strings"
+    return (registry or activeRegistry()).signature(topUnit, bottomUnit)
+
+
+def parseCacheInfo(registry = None):
+    "Returns the hits, misses, maxsize and currsize of the unit string cache"
+    return (registry or activeRegistry()).cacheInfo()
+
+
+def clearParseCache(registry = None):
+    "Drops cached signatures. Registries already start a fresh cache whenever their tables change"
+    (registry or activeRegistry()).clearCache()
+
+
+def isArray(value):
+    "True for ndarray scalars, which are handled elementwise under a single unit"
+    return getattr(value, 'ndim', 0) > 0
+
+
+_SharedDims = {Dimensionless:Dimensionless}
+
+def shareDims(dims):
+    "Returns the one shared instance of an exponent vector so quantities don't each hold a copy"
+    return _SharedDims.setdefault(dims, dims)
+
+
+@_lru_cache(maxsize = ParseCacheSize)
+def _displayNames(newUnitTop, newUnitBottom):
+    topUnit = tuple([tuple(i) for i in parseUnits(newUnitTop)])
+    bottomUnit = tuple([tuple(i) for i in parseUnits(newUnitBottom)])
+    return topUnit, bottomUnit
+
+
+def displayUnits(newUnitTop, newUnitBottom, registry = None):
+    "Returns the exponent vector and the shared (factor, topUnit, bottomUnit) record a quantity keeps after convertTo"
+    registry = registry or activeRegistry()
+    if type(newUnitTop) == str and type(newUnitBottom) == str:
+        dims, factor = registry.signature(newUnitTop, newUnitBottom)
+        topUnit, bottomUnit = _displayNames(newUnitTop, newUnitBottom)
+    else:
+        dims, factor = registry.resolve(newUnitTop, newUnitBottom)
+        topUnit, bottomUnit = _displayNames.__wrapped__(newUnitTop, newUnitBottom)
+    return shareDims(dims), (factor, topUnit, bottomUnit)
+
+
+def _rebuild(cls, scalar, dims, units):
+    return cls.fromDims(scalar, shareDims(dims), units)
+
+
 class ComplexUnits():
-    def __init__(self, num, topUnit = '', bottomUnit = '', dontConvert = False):
+    '''
+    A scalar paired with an exponent vector over BaseUnits.
+    scalar is stored in SI unless convertTo has been called, in which case
+    units holds (factor, topUnit, bottomUnit) of the requested units and
+    scalar * factor recovers the SI value. Both dims and units are
+    immutable and shared between quantities.
+    '''
+    __slots__ = ('scalar', 'dims', 'units')
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        "Runs NumPy ufuncs on the scalar payload, resolving units once through the rules in _UfuncRules"
+        if kwargs.get('out') is not None:
+            return NotImplemented
+        kwargs.pop('out', None)
+        return _applyUfunc(type(self), ufunc, method, inputs, kwargs)
+
+    def __array_function__(self, func, types, args, kwargs):
+        "Runs NumPy functions such as np.sum or np.concatenate on quantities, see _ArrayFunctions"
+        handler = _ArrayFunctions.get(func.__name__) if func.__module__ == 'numpy' else None
+        if handler is None:
+            return NotImplemented
+        return handler(type(self), func, args, kwargs)
+
+    def __init__(self, num, topUnit = '', bottomUnit = '', dontConvert = False, registry = None):
         if dontConvert:
-            self.scalar = num
-            self.topUnit = topUnit
-            self.bottomUnit = bottomUnit
-        
-        if(type(topUnit) == list or type(bottomUnit) == list):
-            topUnit, bottomUnit = self.combineUnits(topUnit, bottomUnit)
-            self.topUnit, self.bottomUnit = self.clearEmpty(topUnit, bottomUnit)
-            self.scalar = num
-            self.topUnit.sort()
-            self.bottomUnit.sort()
-            
-        else:
-            topUnit = list(topUnit.split('*'))    
-            bottomUnit = list(bottomUnit.split('*'))
-            topUnit, bottomUnit = self.expandPowerInit(topUnit, bottomUnit)
-            topUnit, bottomUnit = self.clearEmpty(topUnit, bottomUnit)
-            topUnit, bottomUnit, num = self.convertToSI(topUnit, bottomUnit, num)
-            topUnit, bottomUnit = self.clearEmpty(topUnit, bottomUnit)
-            topUnit, bottomUnit = self.expandPower(topUnit, bottomUnit)
-            topUnit, bottomUnit = self.combineUnits(topUnit, bottomUnit)
-            self.topUnit, self.bottomUnit = self.clearEmpty(topUnit, bottomUnit)
-            self.scalar = num
-            self.topUnit.sort()
-            self.bottomUnit.sort()
-            
-            
+            #Terms are always held as SI plus an exponent vector; silently converting anyway would change results
+            raise TypeError('dontConvert is no longer supported; build the term in SI and call convertTo for display units')
+        dims, num = self.convertToSI(topUnit, bottomUnit, num, registry)
+        self.scalar = num
+        self.dims = dims
+        self.units = None
         return
-    
-    def newUnit(self, topUnit, bottomUnit, doubleList = False):
-        self.topUnit.clear()
-        if doubleList:
-            for i in topUnit:
-                for j in i:
-                    self.topUnit.append(j)
-        else:
-            for i in topUnit:
-                self.topUnit.append(i)
-        
-        self.bottomUnit.clear()
-        if doubleList:
-            for i in bottomUnit:
-                for j in i:
-                    self.bottomUnit.append(j)
+
+    @classmethod
+    def fromDims(cls, num, dims, units = None):
+        "Builds a term directly from an exponent vector, skipping unit parsing"
+        newTerm = cls.__new__(cls)
+        newTerm.scalar = num
+        newTerm.dims = dims
+        newTerm.units = units
+        return newTerm
+
+    def __reduce__(self):
+        "Pickles as just (scalar, dims, units); dims are re-shared on load"
+        return (_rebuild, (type(self), self.scalar, self.dims, self.units))
+
+    @property
+    def topUnit(self):
+        if self.units != None:
+            return [list(i) for i in self.units[1]]
+        return dimsToUnits(self.dims)[0]
+
+    @property
+    def bottomUnit(self):
+        if self.units != None:
+            return [list(i) for i in self.units[2]]
+        return dimsToUnits(self.dims)[1]
+
+    def siScalar(self):
+        if self.units != None:
+            return self.scalar * self.units[0]
+        return self.scalar
+
+    def convertToSI(self, topUnit, bottomUnit, num, registry = None):
+        "Returns the exponent vector of topUnit / bottomUnit and num scaled to SI"
+        registry = registry or activeRegistry()
+        if type(topUnit) == str and type(bottomUnit) == str:
+            dims, factor = registry.signature(topUnit, bottomUnit)
         else:
-            for i in bottomUnit:
-                self.bottomUnit.append(i)
-    
-    def convertToSI(self, topUnit, bottomUnit, num):
-        topUnitTemp = list()
-        bottomUnitTemp = list()
-        
-        for i in topUnit:
-            if (i == ''):
-                continue    
-            conversion = Unit(i[0], returnUnits = True)
-            num *= conversion[0]**i[1]
-            top  = conversion[1].split('*')
-            bottom=conversion[2].split('*')
-            
-            for j in top:
-                topUnitTemp.append([j, i[1]])
-            for j in bottom:
-                bottomUnitTemp.append([j, i[1]])
-                
-        for i in bottomUnit:
-            if i == '':
-                continue
-                
-            conversion = Unit(i[0], returnUnits = True)
-            num /= conversion[0]
-            
-            bottom=conversion[1].split('*')
-            top  = conversion[2].split('*')
-            
-            for j in top:
-                topUnitTemp.append([j, i[1]])
-            for j in bottom:
-                bottomUnitTemp.append([j, i[1]])
-            
-        return topUnitTemp, bottomUnitTemp, num
-
-    
-    def convertTo(self, newUnitTop = '', newUnitBottom = ''):
-        topUnit = newUnitTop.split('*')
-        bottomUnit = newUnitBottom.split('*')
-        
-        self.topUnit, self.bottomUnit, toSIRatio= self.convertToSI(self.topUnit, self.bottomUnit, 1)
-        self.topUnit, self.bottomUnit = self.clearEmpty(self.topUnit, self.bottomUnit)
-        self.topUnit, self.bottomUnit = self.expandPower(self.topUnit, self.bottomUnit)
-        
-        topUnit, bottomUnit = self.expandPowerInit(topUnit, bottomUnit) 
-        topUnit, bottomUnit = self.clearEmpty(topUnit, bottomUnit)
-        
-        topSI, bottomSI, toNewRatio = self.convertToSI(topUnit, bottomUnit, 1)
-        topSI, bottomSI = self.expandPower(topSI, bottomSI)
-        topSI, bottomSI = self.combineUnits(topSI, bottomSI)            
-        topSI, bottomSI = self.clearEmpty(topSI, bottomSI)
-        
-        topSI = sorted(topSI, key= lambda unit: unit[0])
-        bottomSI = sorted(bottomSI, key= lambda unit: unit[0])
-        self.topUnit = sorted(self.topUnit, key= lambda unit: unit[0])
-        self.bottomUnit = sorted(self.bottomUnit, key= lambda unit: unit[0])
-                
-        if topSI != self.topUnit or bottomSI != self.bottomUnit:
-            raise UnitException('Conversion', f'{self.topUnit} / {self.bottomUnit}', f'{topSI} / {bottomSI}')
-            return
-        
-        self.scalar = self.scalar * toSIRatio / toNewRatio
-        self.topUnit = topUnit
-        self.bottomUnit = bottomUnit
-        
-        return #ComplexUnits(self.scalar * toSIRatio / toNewRatio, topUnit, bottomUnit, True)
-        
-    def expandPowerInit(self, topUnit, bottomUnit):
-        topUnitTemp = list()
-        
-        for i in topUnit:
-            if (i.find('^') == -1):
-                topUnitTemp.append(list([i, 1]))
-                continue
-                
-            unit, power = i.split('^')
-            power = float(power)
-            topUnitTemp.append(list([unit, power]))
-        
-        bottomUnitTemp = list()
-        for i in bottomUnit:
-            if (i.find('^') == -1):
-                bottomUnitTemp.append(list([i, 1]))
-                continue
-            
-            unit, power = i.split('^')
-            power = float(power)
-            bottomUnitTemp.append(list([unit, power]))
-       
-        return topUnitTemp, bottomUnitTemp
-    
-    def expandPower(self, topUnit, bottomUnit):
-        topUnitTemp = list()
-        
-        for i in topUnit:
-            if (i[0].find('^') == -1):
-                topUnitTemp.append(list([i[0], i[1]]))
-                continue
-                
-            unit, power = i[0].split('^')
-            power = float(power)
-            topUnitTemp.append(list([unit, power*i[1]]))
-        
-        bottomUnitTemp = list()
-        for i in bottomUnit:
-            if (i[0].find('^') == -1):
-                bottomUnitTemp.append(list([i[0], i[1]]))
-                continue
-                
-            unit, power = i[0].split('^')
-            power = float(power)
-            bottomUnitTemp.append(list([unit, power*i[1]]))
-       
-        return topUnitTemp, bottomUnitTemp
-    
-    
-    def combineUnits(self, topUnit, bottomUnit):
-        itemsRemovedTop = 0
-        itemsRemovedBottom = 0
-        for i in range(len(topUnit)):
-            i -= itemsRemovedTop
-            for j in range(len(bottomUnit)):
-                j -= itemsRemovedBottom
-                if topUnit[i][0] == bottomUnit[j][0]:
-                    if topUnit[i][1] > bottomUnit[j][1]:
-                        topUnit[i][1] -= bottomUnit[j][1]
-                        bottomUnit.remove(bottomUnit[j])
-                        itemsRemovedBottom += 1
-                        
-                    elif topUnit[i][1] < bottomUnit[j][1]:
-                        bottomUnit[j][1] -= topUnit[i][1]
-                        topUnit.remove(topUnit[i])
-                        itemsRemovedTop += 1
-                        break
-                                      
-                    else:
-                        bottomUnit.remove(bottomUnit[j])
-                        topUnit.remove(topUnit[i])
-                        itemsRemovedTop += 1
-                        break
-                        
-        itemsRemoved = 0
-        for i in range(len(topUnit)):
-            i -= itemsRemoved
-            for j in range(len(topUnit)):
-                if i == j:
-                    continue
-                if topUnit[i][0] == topUnit[j][0]:
-                    topUnit[i][1] += topUnit[j][1]
-                    topUnit.remove(topUnit[j])
-                    itemsRemoved += 1
-                    break
-            
-        itemsRemoved = 0
-        for i in range(len(bottomUnit)):
-            i -= itemsRemoved
-            for j in range(len(bottomUnit)):
-                if i == j:
-                    continue
-                if bottomUnit[i][0] == bottomUnit[j][0]:
-                    bottomUnit[i][1] += bottomUnit[j][1]
-                    bottomUnit.remove(bottomUnit[j])
-                    itemsRemoved += 1
-                    break
-            
-        return topUnit, bottomUnit
-    
-    def clearEmpty(self, topUnit, bottomUnit):
-        itemsRemoved = 0;
-        for i in range(len(topUnit)):
-            if(len(topUnit[i - itemsRemoved][0]) == 0):
-                topUnit.remove(topUnit[i-itemsRemoved])
-                itemsRemoved +=1
-                
-        itemsRemoved = 0;
-        for i in range(len(bottomUnit)):
-            if(len(bottomUnit[i - itemsRemoved][0]) == 0):
-                bottomUnit.remove(bottomUnit[i - itemsRemoved])
-                itemsRemoved +=1
-                
-        return topUnit, bottomUnit
-    
+            dims, factor = registry.resolve(topUnit, bottomUnit)
+
+        return shareDims(dims), num * factor
+
+    def convertTo(self, newUnitTop = '', newUnitBottom = '', registry = None):
+        dims, units = displayUnits(newUnitTop, newUnitBottom, registry)
+
+        if dims != self.dims:
+            newTop, newBottom = dimsToUnits(dims)
+            raise UnitException('Conversion', f'{self.topUnit} / {self.bottomUnit}', f'{newTop} / {newBottom}')
+
+        self.scalar = self.siScalar() / units[0]
+        self.units = units
+        return
+
     def __add__(self, other):
-        
-        if self.isDimensionless() and type(other) != type(self):
-            newTerm = ComplexUnits(self.scalar + other, self.topUnit, self.bottomUnit)
-            
-        elif not self.isDimensionallyConsistent(other):
+
+        if not isinstance(other, ComplexUnits):
+            if not self.isDimensionless():
+                raise UnitException('Addition', f'{self.topUnit} / {self.bottomUnit}', other)
+            return self.fromDims(self.siScalar() + other, self.dims)
+
+        if not self.isDimensionallyConsistent(other):
             raise UnitException('Addition', f'{self.topUnit} / {self.bottomUnit}', f'{other.topUnit} / {other.bottomUnit}')
-        
-        elif type(self) == type(other):
-            newTerm = ComplexUnits(self.scalar + other.scalar, self.topUnit, self.bottomUnit)
-            
-        return newTerm
-    
+
+        if self.units == other.units:
+            return self.fromDims(self.scalar + other.scalar, self.dims, self.units)
+
+        return self.fromDims(self.siScalar() + other.siScalar(), self.dims)
+
     def __sub__(self,other):
-        
-        if type(other) == type(self):
-            negative = ComplexUnits(other.scalar * -1, other.topUnit, other.bottomUnit)
-        
+
+        if isinstance(other, ComplexUnits):
+            negative = self.fromDims(other.scalar * -1, other.dims, other.units)
+
         else:
             negative = -1 * other
-        
+
         return self + negative
-    
+
     def __mul__(self,other):
-        if type(other) == type(self):
-            topUnit = list()
-            bottomUnit = list()
-            
-            for i in range(len(self.topUnit)):
-                topUnit.append(list())
-                topUnit[i].append(self.topUnit[i][0])
-                topUnit[i].append(self.topUnit[i][1])
-                
-            for i in range(len(self.bottomUnit)):
-                bottomUnit.append(list())
-                bottomUnit[i].append(self.bottomUnit[i][0])
-                bottomUnit[i].append(self.bottomUnit[i][1])
-            
-            for i in range(len(other.topUnit)):
-                j = i + len(self.topUnit)
-                topUnit.append(list())
-                topUnit[j].append(other.topUnit[i][0])
-                topUnit[j].append(other.topUnit[i][1])
-                
-            for i in range(len(other.bottomUnit)):
-                j = i + len(self.bottomUnit)
-                bottomUnit.append(list())
-                bottomUnit[j].append(other.bottomUnit[i][0])
-                bottomUnit[j].append(other.bottomUnit[i][1])
-            
-            newTerm = ComplexUnits(self.scalar * other.scalar, topUnit, bottomUnit)
-            return newTerm
-        
+        if isinstance(other, ComplexUnits):
+            dims = shareDims(tuple([i + j for i, j in zip(self.dims, other.dims)]))
+            return self.fromDims(self.siScalar() * other.siScalar(), dims)
+
         else:
-            newTerm = ComplexUnits(self.scalar * other, self.topUnit, self.bottomUnit)
-            return newTerm            
-    
+            return self.fromDims(self.scalar * other, self.dims, self.units)
+
     def __truediv__(self, other):
-        topUnit = other.bottomUnit
-        bottomUnit = other.topUnit
-        
-        recipricol = ComplexUnits(other.scalar**-1,topUnit,bottomUnit)
-        
-        return self * recipricol
-    
+        if isinstance(other, ComplexUnits):
+            dims = shareDims(tuple([i - j for i, j in zip(self.dims, other.dims)]))
+            return self.fromDims(self.siScalar() / other.siScalar(), dims)
+
+        else:
+            return self.fromDims(self.scalar / other, self.dims, self.units)
+
     def __rtruediv__(self, other):
-        topUnit = self.bottomUnit
-        bottomUnit = self.topUnit
-        
-        recipricol = ComplexUnits(self.scalar**-1, topUnit, bottomUnit)
-        return recipricol * other
-    
+        dims = shareDims(tuple([-i for i in self.dims]))
+        return self.fromDims(other / self.siScalar(), dims)
+
     def __pow__(self, other):
-        
-        
-        if(self.isDimensionless()):
-            newTerm = ComplexUnits(self.scalar**other, self.topUnit, self.bottomUnit)
-            return newTerm
-        
-        elif other > 0:
-            
-            topUnit = list()
-            bottomUnit  = list()
-            
-            for i in range(len(self.topUnit)):
-                topUnit.append(list())
-                topUnit[i].append(self.topUnit[i][0])
-                topUnit[i].append(self.topUnit[i][1])
-                topUnit[i][1] *= other
-                
-            for i in range(len(self.bottomUnit)):
-                bottomUnit.append(list())
-                bottomUnit[i].append(self.bottomUnit[i][0])
-                bottomUnit[i].append(self.bottomUnit[i][1])
-                bottomUnit[i][1] *= other
-
-            scalar = self.scalar**other
-            return ComplexUnits(scalar, topUnit, bottomUnit)
-        
-        elif other < 0:
-            other *= -1
-            newSelf = 1 / self
-            return newSelf**other
-        
-        elif other == 0:
-            return self / self
-        
-        else:
-            raise Exception('Fractional Powers Not Yet Supported')
-    
+        dims = shareDims(tuple([i * other for i in self.dims]))
+        return self.fromDims(self.siScalar()**other, dims)
+
     def __str__(self):
         return self.toString()
-        
+
     def toString(self):
         return str(self.scalar) +  str(self.topUnit) + str(self.bottomUnit)
-    
+
     def __printUnits__(self):
-        
+
         stringTop = ''
         for i in self.topUnit:
             stringTop += f"{(str(i[0]) + '^' + str(i[1])) if i[1] != 1 else i[0]} "
-        
+
         stringBottom = ''
         for i in self.bottomUnit:
             stringBottom += f"{(str(i[0]) + '^' + str(i[1])) if i[1] != 1 else i[0]} "
-        
+
         finalString = f"{stringTop}{'/ ' if stringBottom != '' else ''}{stringBottom}"
         finalString = finalString.replace('_','')
-        
+
         return finalString
-    
+
     def prettyPrint(self):
-        return f"{self.scalar*1.0:.5} {self.__printUnits__()}"            
-    
+        if isArray(self.scalar):
+            import numpy as np
+            return f"{np.array2string(self.scalar*1.0, precision = 5)} {self.__printUnits__()}"
+        return f"{self.scalar*1.0:.5} {self.__printUnits__()}"
+
     def isDimensionallyConsistent(self, other):
-        return self.topUnit==other.topUnit and self.bottomUnit==other.bottomUnit
-    
+        return self.dims == other.dims
+
     def isDimensionless(self):
-        return len(self.topUnit) == 0 and len(self.bottomUnit) == 0
+        return self.dims == Dimensionless
+
 
+class UUU(ComplexUnits):
+    '''
+    The user facing quantity. UUU is a slotted ComplexUnits, so each
+    quantity is a single small object; innerGunk is kept as an alias of
+    the quantity itself for code written against the old wrapper.
 
-class UUU():
-    def __init__(self, topUnit = "", bottomUnit = "", existingTerm = "", num = 1):
+    num may be an ndarray, giving one quantity for a whole series that
+    shares a single unit signature. Arithmetic on such a quantity runs
+    vectorized in NumPy and checks units once per operation.
+    '''
+    __slots__ = ()
+
+    def __init__(self, topUnit = "", bottomUnit = "", existingTerm = "", num = 1, registry = None):
         if existingTerm != '':
-            self.innerGunk = existingTerm
+            self.scalar = existingTerm.scalar
+            self.dims = existingTerm.dims
+            self.units = existingTerm.units
         else:
-            self.innerGunk = ComplexUnits(num, topUnit, bottomUnit)
+            ComplexUnits.__init__(self, num, topUnit, bottomUnit, registry = registry)
         return
-    
-    def __add__(self, other):
-        if type(self) == type(other):
-            calc = self.innerGunk + other.innerGunk
-        else:
-            calc = self.innerGunk + other
-            
-        newTerm = UUU(existingTerm = calc)
-        return newTerm
-    
+
+    @property
+    def innerGunk(self):
+        return self
+
     def __radd__(self, other):
         return self + other
-    
-    def __sub__(self,other):
-        if type(self) == type(other):
-            calc = self.innerGunk - other.innerGunk
-        else:
-            calc = self.innerGunk - other
-        newTerm = UUU(existingTerm = calc)
-        return newTerm
-    
+
     def __rsub__(self, other):
         return self * -1 + other
-    
-    def __mul__(self,other):
-        if type(other) == type(self):
-            calc = self.innerGunk * other.innerGunk
-            newTerm = UUU(existingTerm = calc)
-            return newTerm
-        
-        else:
-            calc = self.innerGunk * other
-            newTerm = UUU(existingTerm = calc)
-            return newTerm
-        
+
     def __rmul__(self,other):
-        if type(other) == type(self):
-            calc = self.innerGunk * other.innerGunk
-            newTerm = UUU(existingTerm = calc)
-            return newTerm
-        else:
-            calc = self.innerGunk * other
-            newTerm = UUU(existingTerm = calc)
-        return newTerm    
+        return self * other
 
-    
-    def __truediv__(self, other):
-        if type(other) == type(self):
-            calc = self.innerGunk / other.innerGunk
-            newTerm = UUU(existingTerm = calc)
-            return newTerm
-        
-        else:
-            calc = self.innerGunk * other**-1
-            newTerm = UUU(existingTerm = calc)
-            return newTerm
-        
-    def __rtruediv__(self, other):
-        calc = other / self.innerGunk
-        newTerm = UUU(existingTerm = calc)
-        return newTerm
-    
-    def __pow__(self, other):
-        calc = self.innerGunk**other
-        newTerm = UUU(existingTerm = calc)
-        return newTerm
-    
     def __neg__(self):
-        calc = self.innerGunk * -1
-        return UUU(existingTerm = calc)
-    
+        return self * -1
+
     def __str__(self):
         return self.prettyPrint()
-    
+
     def __float__(self):
-        if self.innerGunk.isDimensionless():
-            return self.innerGunk.scalar
-        
+        if self.isDimensionless():
+            return self.siScalar()
+
         else:
             raise Exception('Cannot convert Unit Class to a Float')
 
-    
+
     def __int__(self):
-        if self.innerGunk.isDimensionless and (self.innerGunk.scalar % 1 == 0):
-            return int(self.innerGunk.scalar)
-        
+        if self.isDimensionless() and (self.siScalar() % 1 == 0):
+            return int(self.siScalar())
+
         else:
             raise Exception('Cannot convert Unit Class to an Integer')
-     
-    def toString(self):
-        return self.innerGunk.toString()
-    
+
+    def __bool__(self):
+        "Quantities are always truthy, as before len() existed; array-backed ones follow NumPy"
+        if isArray(self.scalar):
+            return bool(self.scalar)
+        return True
+
+    def __len__(self):
+        if not isArray(self.scalar):
+            raise TypeError('len() of a scalar quantity; only array-backed UUU have a length')
+        return len(self.scalar)
+
+    def __getitem__(self, index):
+        if not isArray(self.scalar):
+            raise TypeError('Only array-backed UUU can be indexed')
+        return UUU.fromDims(self.scalar[index], self.dims, self.units)
+
     def getNum(self):
-        return self.innerGunk.scalar
-    
-    def prettyPrint(self):
-        return self.innerGunk.prettyPrint()
-    
+        return self.scalar
+
     def printUnits(self):
-        return self.innerGunk.__printUnits__()
-    
-    def convertTo(self, newUnitTop = '', newUnitBottom = ''):
-        return UUU(existingTerm = self.innerGunk.convertTo(newUnitTop, newUnitBottom))
+        return self.__printUnits__()
+
+    def convertTo(self, newUnitTop = '', newUnitBottom = '', registry = None):
+        ComplexUnits.convertTo(self, newUnitTop, newUnitBottom, registry)
+        return self
+
+
+def arrayU(quantities):
+    "Packs a list of UUU sharing dimensions into one UUU backed by an ndarray"
+    import numpy as np
+
+    first = quantities[0]
+    units = first.units
+    for i in quantities:
+        if not first.isDimensionallyConsistent(i):
+            raise UnitException('Array', f'{first.topUnit} / {first.bottomUnit}', f'{i.topUnit} / {i.bottomUnit}')
+        if i.units != units:
+            units = None
+
+    if units != None:
+        scalar = np.array([i.scalar for i in quantities], dtype = float)
+    else:
+        scalar = np.array([i.siScalar() for i in quantities], dtype = float)
+
+    return UUU.fromDims(scalar, first.dims, units)
+
+
+# ## NumPy Dispatch
+# Ufuncs and array functions are grouped by how they treat units. Each call
+# checks the exponent vectors once, then runs on the whole payload in NumPy.
+# Values stay in their display units where the result keeps them, and are
+# taken to SI otherwise.
+
+def _unitText(value):
+    if isinstance(value, ComplexUnits):
+        return f'{value.topUnit} / {value.bottomUnit}'
+    return 'a plain number'
+
+
+def _siValue(value):
+    return value.siScalar() if isinstance(value, ComplexUnits) else value
+
+
+def _dimsOf(value):
+    return value.dims if isinstance(value, ComplexUnits) else Dimensionless
+
+
+def _matchingValues(operation, values):
+    "Checks values share dimensions. Returns (dims, units, payloads), keeping display units when all values share them"
+    first = next(i for i in values if isinstance(i, ComplexUnits))
+    for i in values:
+        if _dimsOf(i) != first.dims:
+            raise UnitException(operation, _unitText(first), _unitText(i))
+
+    units = first.units
+    if all(isinstance(i, ComplexUnits) and i.units == units for i in values):
+        return first.dims, units, [i.scalar for i in values]
+    return first.dims, None, [_siValue(i) for i in values]
+
+
+def _scaledDims(dims, power):
+    return shareDims(tuple([i * power for i in dims]))
+
+
+#Result keeps the common units of its inputs
+_MatchingUfuncs = {'add', 'subtract', 'maximum', 'minimum', 'fmax', 'fmin', 'hypot', 'fmod', 'remainder'}
+#Inputs share units, result is plain
+_ComparisonUfuncs = {'equal', 'not_equal', 'less', 'less_equal', 'greater', 'greater_equal', 'arctan2'}
+#One input, result keeps its units
+_LinearUfuncs = {'negative', 'positive', 'absolute', 'fabs', 'conjugate', 'rint', 'floor', 'ceil', 'trunc'}
+#Any units, result is plain
+_PredicateUfuncs = {'isnan', 'isinf', 'isfinite', 'signbit', 'sign'}
+#Input must be dimensionless, result is plain
+_DimensionlessUfuncs = {'exp', 'exp2', 'expm1', 'log', 'log2', 'log10', 'log1p',
+                        'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan',
+                        'sinh', 'cosh', 'tanh', 'arcsinh', 'arccosh', 'arctanh',
+                        'deg2rad', 'rad2deg', 'degrees', 'radians'}
+#One input, exponents scale by a fixed power
+_PowerUfuncs = {'sqrt': 0.5, 'cbrt': 1/3, 'square': 2, 'reciprocal': -1}
+#Exponents add (or subtract for the second input)
+_ProductUfuncs = {'multiply': 1, 'matmul': 1, 'divide': -1, 'true_divide': -1}
+#Reductions that keep units
+_ReducibleUfuncs = {'add', 'maximum', 'minimum', 'fmax', 'fmin'}
+
+
+def _applyUfunc(cls, ufunc, method, inputs, kwargs):
+    name = ufunc.__name__
+
+    if method in ('reduce', 'accumulate', 'reduceat'):
+        term = inputs[0]
+        if name not in _ReducibleUfuncs or (method != 'reduce' and name != 'add') or not isinstance(term, ComplexUnits):
+            return NotImplemented
+        return cls.fromDims(getattr(ufunc, method)(term.scalar, *inputs[1:], **kwargs), term.dims, term.units)
+
+    if method != '__call__':
+        return NotImplemented
+
+    if name in _MatchingUfuncs:
+        dims, units, values = _matchingValues(name, inputs)
+        return cls.fromDims(ufunc(*values, **kwargs), dims, units)
+
+    if name in _ComparisonUfuncs:
+        dims, units, values = _matchingValues(name, inputs)
+        return ufunc(*values, **kwargs)
+
+    term = inputs[0]
+    if name in _LinearUfuncs:
+        return cls.fromDims(ufunc(term.scalar, **kwargs), term.dims, term.units)
+
+    if name in _PredicateUfuncs:
+        return ufunc(term.scalar, **kwargs)
+
+    if name in _DimensionlessUfuncs:
+        if term.dims != Dimensionless:
+            raise UnitException(name, _unitText(term), 'dimensionless')
+        return ufunc(term.siScalar(), **kwargs)
+
+    if name in _PowerUfuncs:
+        return cls.fromDims(ufunc(term.siScalar(), **kwargs), _scaledDims(term.dims, _PowerUfuncs[name]))
+
+    if name in _ProductUfuncs:
+        first, second = inputs
+        sign = _ProductUfuncs[name]
+        if not isinstance(second, ComplexUnits):
+            return cls.fromDims(ufunc(first.scalar, second, **kwargs), first.dims, first.units)
+        if not isinstance(first, ComplexUnits) and sign == 1:
+            return cls.fromDims(ufunc(first, second.scalar, **kwargs), second.dims, second.units)
+        dims = shareDims(tuple([i + sign * j for i, j in zip(_dimsOf(first), second.dims)]))
+        return cls.fromDims(ufunc(_siValue(first), second.siScalar(), **kwargs), dims)
+
+    if name in ('power', 'float_power'):
+        base, exponent = inputs
+        if isinstance(exponent, ComplexUnits):
+            if exponent.dims != Dimensionless:
+                raise UnitException(name, 'an exponent of ' + _unitText(exponent), 'dimensionless')
+            exponent = exponent.siScalar()
+        if not isinstance(base, ComplexUnits):
+            return ufunc(base, exponent, **kwargs)
+        if base.dims == Dimensionless:
+            return cls.fromDims(ufunc(base.siScalar(), exponent, **kwargs), Dimensionless)
+        if getattr(exponent, 'ndim', 0) > 0:
+            raise UnitException(name, _unitText(base), 'an array of exponents')
+        return cls.fromDims(ufunc(base.siScalar(), exponent, **kwargs), _scaledDims(base.dims, float(exponent)))
+
+    return NotImplemented
+
+
+def _keepUnits(cls, func, args, kwargs):
+    "Functions of one quantity whose result has the same units, e.g. np.sum or np.median"
+    term = args[0]
+    return cls.fromDims(func(term.scalar, *args[1:], **kwargs), term.dims, term.units)
+
+
+def _squaredUnits(cls, func, args, kwargs):
+    term = args[0]
+    return cls.fromDims(func(term.siScalar(), *args[1:], **kwargs), _scaledDims(term.dims, 2))
+
+
+def _plainResult(cls, func, args, kwargs):
+    "Functions that only look at the payload's layout, e.g. np.shape"
+    return func(args[0].scalar, *args[1:], **kwargs)
+
+
+def _joined(cls, func, args, kwargs):
+    "Functions taking a sequence of quantities sharing dimensions, e.g. np.concatenate"
+    dims, units, values = _matchingValues(func.__name__, list(args[0]))
+    return cls.fromDims(func(values, *args[1:], **kwargs), dims, units)
+
+
+def _compared(cls, func, args, kwargs):
+    "np.isclose and friends; a UUU atol is taken to SI along with the values"
+    dims, units, values = _matchingValues(func.__name__, list(args[:2]))
+    if units == None:
+        kwargs = {name: _siValue(value) for name, value in kwargs.items()}
+    elif isinstance(kwargs.get('atol'), ComplexUnits):
+        kwargs = dict(kwargs, atol = kwargs['atol'].siScalar() / units[0])
+    return func(*values, *args[2:], **kwargs)
+
+
+def _product(cls, func, args, kwargs):
+    "np.dot and friends; exponents of the two operands add"
+    first, second = args[:2]
+    dims = shareDims(tuple([i + j for i, j in zip(_dimsOf(first), _dimsOf(second))]))
+    return cls.fromDims(func(_siValue(first), _siValue(second), *args[2:], **kwargs), dims)
 
 
+_ArrayFunctions = {}
+for _names, _handler in ((('sum', 'nansum', 'cumsum', 'nancumsum', 'mean', 'nanmean', 'average', 'median', 'nanmedian',
+                           'max', 'amax', 'min', 'amin', 'nanmax', 'nanmin', 'ptp', 'std', 'nanstd', 'percentile',
+                           'quantile', 'round', 'around', 'diff', 'sort', 'copy', 'squeeze', 'ravel', 'reshape',
+                           'transpose', 'flip', 'repeat', 'tile', 'atleast_1d', 'atleast_2d', 'broadcast_to'), _keepUnits),
+                         (('var', 'nanvar'), _squaredUnits),
+                         (('shape', 'ndim', 'size', 'argmax', 'argmin', 'argsort', 'nonzero', 'isnan', 'isfinite'), _plainResult),
+                         (('concatenate', 'stack', 'vstack', 'hstack', 'column_stack'), _joined),
+                         (('isclose', 'allclose', 'array_equal'), _compared),
+                         (('dot', 'inner', 'outer', 'cross', 'tensordot'), _product)):
+    for _name in _names:
+        _ArrayFunctions[_name] = _handler
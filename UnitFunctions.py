@@ -1,9 +1,14 @@
+from .UnitClass import UUU, ComplexUnits, UnitException, Dimensionless, dimsToUnits, arrayU, shareDims, _matchingValues
+
 # Wrapped Functions for Unit Integration
+# numpy, scipy and matplotlib are imported inside each function so that
+# importing the package doesn't pay for them until one is first used.
 def log10(value, unitOveride = False):
     "Takes a unitless value and returns the log10 in scalar form"
     if (not value.innerGunk.isDimensionless()) or unitOveride:
         raise UnitException('Log', value.printUnits(), unitOveride)
 
+    import numpy as np
     newVal = np.log10(value.innerGunk.scalar)
     return newVal
 
@@ -14,6 +19,7 @@ def log(value, unitOveride = False):
     if (not value.innerGunk.isDimensionless()) or unitOveride:
         raise UnitException('Natural Log', value.printUnits(), unitOveride)
 
+    import numpy as np
     newVal = np.log(value.innerGunk.scalar)
     return newVal
 
@@ -24,103 +30,627 @@ def exp(value, unitOveride = False):
     if (not value.innerGunk.isDimensionless()) or unitOveride:
         raise UnitException('exp', value.printUnits(), unitOveride)
 
+    import numpy as np
     return np.exp(value.innerGunk.scalar)
 
 
 
-def fsolveU(func, guess, arguments = ()):
-    "Standard fsolve that can handle functions that take/return units. Multi-dimension supported"
+class _UnitLayout():
+    '''
+    Records how a value carries its units: a UUU (scalar or array backed),
+    a list mixing UUU and plain numbers, or plain numbers. Raw float
+    vectors can then be moved in and out of that shape using the recorded
+    signatures, with no unit parsing.
+    '''
+    def __init__(self, value):
+        import numpy as np
+
+        self.isList = type(value) in (list, tuple)
+        items = value if self.isList else [value]
+
+        self.signatures = []
+        self.shapes = []
+        for i in items:
+            if isinstance(i, ComplexUnits):
+                self.signatures.append((i.dims, i.units))
+                self.shapes.append(np.shape(i.scalar))
+            else:
+                self.signatures.append(None)
+                self.shapes.append(np.shape(i))
+
+        self.sizes = [int(np.prod(i)) for i in self.shapes]
+        self.size = sum(self.sizes)
+
+    def scales(self):
+        "Returns the factor taking each raw entry to SI"
+        import numpy as np
+
+        scale = []
+        for signature, size in zip(self.signatures, self.sizes):
+            factor = 1
+            if signature != None and signature[1] != None:
+                factor = signature[1][0]
+            scale += [factor] * size
+        return np.array(scale, dtype = float)
+
+    def dimsList(self):
+        "Returns the exponent vector of each raw entry"
+        dims = []
+        for signature, size in zip(self.signatures, self.sizes):
+            dims += [signature[0] if signature != None else Dimensionless] * size
+        return dims
+
+    def toRaw(self, value, checkUnits = False):
+        "Flattens value into a float ndarray expressed in the recorded units"
+        import numpy as np
+
+        items = value if self.isList else [value]
+        raw = []
+        for i, signature in zip(items, self.signatures):
+            if not isinstance(i, ComplexUnits):
+                raw.append(np.ravel(i))
+                continue
+
+            if checkUnits and (signature == None or i.dims != signature[0]):
+                raise UnitException('Unit Signature', f'{i.topUnit} / {i.bottomUnit}', 'the units of the first evaluation')
+
+            if signature == None or i.units == signature[1]:
+                raw.append(np.ravel(i.scalar))
+            elif signature[1] == None:
+                raw.append(np.ravel(i.siScalar()))
+            else:
+                raw.append(np.ravel(i.siScalar() / signature[1][0]))
+
+        if len(raw) == 1:
+            return np.asarray(raw[0], dtype = float)
+        return np.concatenate(raw).astype(float)
+
+    def toUnits(self, raw):
+        "Rebuilds a value shaped like the recorded one from a raw vector. Extra trailing axes (e.g. time) are kept"
+        items = []
+        start = 0
+        for signature, shape, size in zip(self.signatures, self.shapes, self.sizes):
+            part = raw[start:start + size]
+            start += size
+            part = part.reshape(shape + raw.shape[1:]) if shape != () or raw.ndim > 1 else part[0]
+
+            if signature == None:
+                items.append(part)
+            else:
+                items.append(UUU.fromDims(part, signature[0], signature[1]))
+
+        if self.isList:
+            return items
+        return items[0]
+
+
+def _rawJacobian(jac, inputs, outputs, inScale, outScale, checkUnits):
+    '''
+    Converts a unit-aware Jacobian to d(raw residual)/d(raw input).
+    jac may be a list of rows of UUU/numbers, a UUU backed by a 2D array
+    (all entries sharing units), or plain numbers already in raw units.
+    '''
+    import numpy as np
+
+    shape = (outputs.size, inputs.size)
+    if isinstance(jac, ComplexUnits):
+        if checkUnits:
+            for outDims in outputs.dimsList():
+                for inDims in inputs.dimsList():
+                    expected = tuple([i - j for i, j in zip(outDims, inDims)])
+                    if jac.dims != expected:
+                        raise UnitException('Jacobian', f'{jac.topUnit} / {jac.bottomUnit}', '%s / %s' % dimsToUnits(expected))
+        values = np.asarray(jac.siScalar(), dtype = float).reshape(shape)
+        return values * inScale[None, :] / outScale[:, None]
+
+    if type(jac) not in (list, tuple):
+        return np.asarray(jac, dtype = float).reshape(shape)
+
+    rows = jac if type(jac[0]) in (list, tuple) else [jac]
+    outDimsList = outputs.dimsList()
+    inDimsList = inputs.dimsList()
+    raw = np.zeros(shape)
+    for i in range(shape[0]):
+        for j in range(shape[1]):
+            entry = rows[i][j]
+            if not isinstance(entry, ComplexUnits):
+                raw[i, j] = entry
+                continue
+
+            if checkUnits:
+                expected = tuple([k - l for k, l in zip(outDimsList[i], inDimsList[j])])
+                if entry.dims != expected:
+                    raise UnitException('Jacobian', f'{entry.topUnit} / {entry.bottomUnit}', '%s / %s' % dimsToUnits(expected))
+            raw[i, j] = entry.siScalar() * inScale[j] / outScale[i]
+    return raw
+
+
+def fsolveU(func, guess, arguments = (), checkUnits = False, nondimensionalize = False, jacobian = None, report = False, **kwargs):
+    '''
+    Standard fsolve that can handle functions that take/return units. Multi-dimension supported.
+    func is called once with the unit-aware guess to record the units of its inputs and
+    outputs. The solver then works on raw float vectors: inputs are rebuilt from the recorded
+    signatures without parsing and residuals are stripped in one step. Units are reattached
+    to the result in the shape of guess (UUU, array UUU or list).
+
+    checkUnits= verify the residual (and Jacobian) units on every evaluation, not just the first
+    nondimensionalize= scale each variable by its guess magnitude and each residual by its
+                       magnitude at the guess (1 SI unit where those are zero), so the solver
+                       sees order 1 numbers whether the system mixes Pa, mol or K
+    jacobian= optional func(x, *arguments) returning d residual_i / d x_j with units, as a list
+              of rows of UUU/numbers or a UUU wrapping a 2D array
+    report= also return a dict with the function/Jacobian evaluation counts and solver status
+    kwargs are passed on to scipy.optimize.fsolve
+    '''
+    import numpy as np
+    from scipy.optimize import fsolve
+
     try:
-        func(guess, *arguments)
-    except:
-        raise Exception('Couldn\'t compute function')
+        firstReturn = func(guess, *arguments)
+    except Exception as error:
+        raise Exception('Couldn\'t compute function') from error
+
+    inputs = _UnitLayout(guess)
+    outputs = _UnitLayout(firstReturn)
+    inScale = inputs.scales()
+    outScale = outputs.scales()
+    x0 = inputs.toRaw(guess)
+
+    xScale = np.ones(inputs.size)
+    fScale = np.ones(outputs.size)
+    if nondimensionalize:
+        f0 = outputs.toRaw(firstReturn)
+        xScale = np.where(x0 != 0, np.abs(x0), 1 / inScale)
+        fScale = np.where(f0 != 0, np.abs(f0), 1 / outScale)
+
+    counts = {'nfev': 1, 'njev': 0}
+
+    def rawFunc(z):
+        counts['nfev'] += 1
+        funcReturn = func(inputs.toUnits(z * xScale), *arguments)
+        return outputs.toRaw(funcReturn, checkUnits) / fScale
+
+    def rawJacobian(z):
+        counts['njev'] += 1
+        jac = jacobian(inputs.toUnits(z * xScale), *arguments)
+        raw = _rawJacobian(jac, inputs, outputs, inScale, outScale, checkUnits or counts['njev'] == 1)
+        return raw * xScale[None, :] / fScale[:, None]
+
+    fullOutput = kwargs.pop('full_output', False)
+    z, info, ier, mesg = fsolve(rawFunc, x0 / xScale, fprime = rawJacobian if jacobian else None, full_output = True, **kwargs)
+    ans = inputs.toUnits(z * xScale)
+
+    if report:
+        return ans, {'nfev': counts['nfev'], 'njev': counts['njev'], 'ier': ier, 'mesg': mesg, 'nondimensionalized': nondimensionalize}
+    if fullOutput:
+        return ans, info, ier, mesg
+    return ans
 
-    guessUnit = 1
 
-    if type(guess) == type(UUU('')):
-        guessUnit = UUU(guess.innerGunk.topUnit, guess.innerGunk.bottomUnit)
-        guess = guess.getNum()
 
-    elif type(guess) == type(list()):
-        guessUnit = []
-        temp = []
 
-        for i in range(len(guess)):
-            if type(guess[i]) == type(UUU('')):
-                guessUnit.append(UUU(guess[i].innerGunk.topUnit, guess[i].innerGunk.bottomUnit))
-                guess[i] = guess[i].getNum()
+def _gaussNodes(lower, upper, order, intervals):
+    "Returns the nodes and weights of a composite Gauss-Legendre rule on [lower, upper]"
+    import numpy as np
 
-            else:
-                guessUnit.append(1)
-
-    def newFunc(guess):
-        guess = guess * guessUnit
-        funcReturn = func(guess, *arguments)
-        ans = []
-        for i in range(len(guess)):
-            if type(funcReturn[i]) == type(UUU('')):
-                ans.append(funcReturn[i].getNum())
-            else:
-                ans.append(funcReturn)
+    points, weights = np.polynomial.legendre.leggauss(order)
+    edges = np.linspace(lower, upper, intervals + 1)
+    halfWidth = (edges[1:] - edges[:-1]) / 2
+    middle = (edges[1:] + edges[:-1]) / 2
 
-        return ans
+    nodes = (middle[:, None] + halfWidth[:, None] * points[None, :]).ravel()
+    nodeWeights = (halfWidth[:, None] * weights[None, :]).ravel()
+    return nodes, nodeWeights
 
-    num = fsolve(newFunc, guess)
-    ans = num * guessUnit
+
+def quadU(func, lowerBound, upperBound, arguments = (), method = 'quad', order = 20, intervals = 1, report = False, **kwargs):
+    '''
+    Standard quad that can handle functions that take/return units.
+    func is called once at lowerBound to record the units of x and of the integrand;
+    the integral carries (integrand units) * (x units).
+
+    method=
+        'quad'     scipy.integrate.quad on a scalar integrand, one call per node
+        'quad_vec' scipy.integrate.quad_vec, allows a vector integrand (list of UUU or array UUU)
+        'gauss'    fixed composite Gauss-Legendre rule with order nodes on each of intervals panels.
+                   func is called once with every node as a single array-backed UUU and must
+                   work elementwise; a list of array UUU integrates each entry
+    report= also return a dict with the number of integrand evaluations (and nodes for 'gauss')
+    kwargs are passed on to quad / quad_vec
+    '''
+    import numpy as np
+
+    #A quantity and a plain number as bounds would integrate over mismatched scales
+    if isinstance(lowerBound, ComplexUnits) != isinstance(upperBound, ComplexUnits):
+        described = [f'{i.topUnit} / {i.bottomUnit}' if isinstance(i, ComplexUnits) else 'a plain number' for i in (lowerBound, upperBound)]
+        raise UnitException('Integration Bounds', *described)
+
+    try:
+        firstReturn = func(lowerBound, *arguments)
+    except Exception as error:
+        raise Exception('Couldn\'t compute function') from error
+
+    bounds = _UnitLayout(lowerBound)
+    outputs = _UnitLayout(firstReturn)
+    lower = bounds.toRaw(lowerBound, checkUnits = True)[0]
+    upper = bounds.toRaw(upperBound, checkUnits = True)[0]
+    boundSignature = bounds.signatures[0]
+    counts = {'nfev': 1}
+
+    def withBoundUnits(value):
+        if boundSignature == None:
+            return value
+        boundUnit = UUU.fromDims(1.0, boundSignature[0], boundSignature[1])
+        if type(value) == list:
+            return [i * boundUnit for i in value]
+        return value * boundUnit
+
+    if method == 'gauss':
+        nodes, weights = _gaussNodes(lower, upper, order, intervals)
+        x = nodes if boundSignature == None else UUU.fromDims(nodes, boundSignature[0], boundSignature[1])
+        funcReturn = func(x, *arguments)
+        counts['nfev'] += 1
+        counts['nodes'] = len(nodes)
+
+        items = funcReturn if type(funcReturn) in (list, tuple) else [funcReturn]
+        integrals = []
+        for item in items:
+            if isinstance(item, ComplexUnits):
+                values = np.broadcast_to(item.scalar, (len(nodes),) + np.shape(item.scalar)[1:])
+                integrals.append(UUU.fromDims(np.tensordot(weights, values, axes = (0, 0)), item.dims, item.units))
+            else:
+                values = np.broadcast_to(item, (len(nodes),) + np.shape(item)[1:])
+                integrals.append(np.tensordot(weights, values, axes = (0, 0)))
+        ans = integrals if type(funcReturn) in (list, tuple) else integrals[0]
+
+    else:
+        from scipy.integrate import quad, quad_vec
+
+        def rawFunc(x):
+            counts['nfev'] += 1
+            return outputs.toRaw(func(bounds.toUnits(np.array([x])), *arguments))
+
+        if method == 'quad_vec':
+            num = quad_vec(rawFunc, lower, upper, **kwargs)[0]
+            ans = outputs.toUnits(np.atleast_1d(num))
+        elif method == 'quad':
+            num = quad(lambda x: rawFunc(x)[0], lower, upper, **kwargs)[0]
+            ans = outputs.toUnits(np.array([num]))
+        else:
+            raise ValueError(f'Unknown integration method {method}')
+
+    ans = withBoundUnits(ans)
+    if report:
+        return ans, counts
     return ans
 
 
 
 
-def quadU(func, lowerBound, upperBound, arguments = ()):
-    "Standard quad that can handle functions that take/return units"
+def solve_ivpU(func, tSpan, y0, arguments = (), checkUnits = False, **kwargs):
+    '''
+    Standard solve_ivp that can handle a state of quantities and a unit-aware right hand side.
+    func(t, y, *arguments) returns dy/dt shaped like y0 (UUU, array UUU or list of UUU/floats).
+
+    The units of dy/dt are checked against y0 / t once, before integrating. The solver then
+    runs on raw floats in the units of tSpan and y0: each step rebuilds t and y from the
+    recorded signatures without parsing and rescales dy/dt with a precomputed factor vector.
+    Returns scipy's result with t as a time quantity and y shaped like y0, each entry holding
+    the whole time series as an array-backed UUU.
+
+    checkUnits= verify the units of dy/dt on every step, not just the first
+    kwargs are passed on to scipy.integrate.solve_ivp (t_eval may be a UUU)
+    '''
+    from scipy.integrate import solve_ivp
+
+    #A quantity and a plain number as endpoints would integrate over mismatched scales
+    if isinstance(tSpan[0], ComplexUnits) != isinstance(tSpan[1], ComplexUnits):
+        described = [f'{i.topUnit} / {i.bottomUnit}' if isinstance(i, ComplexUnits) else 'a plain number' for i in tSpan[:2]]
+        raise UnitException('Time Span', *described)
+
+    times = _UnitLayout(tSpan[0])
+    states = _UnitLayout(y0)
+    t0 = times.toRaw(tSpan[0])[0]
+    t1 = times.toRaw(tSpan[1], checkUnits = times.signatures[0] != None)[0]
+
     try:
-        func(lowerBound, *arguments)
-    except:
-        raise Exception('Couldn\'t compute function')
+        firstReturn = func(tSpan[0], y0, *arguments)
+    except Exception as error:
+        raise Exception('Couldn\'t compute function') from error
 
-    returnUnit = func(lowerBound, *arguments) * lowerBound
-    returnUnit = UUU(returnUnit.innerGunk.topUnit, returnUnit.innerGunk.bottomUnit)
+    rates = _UnitLayout(firstReturn)
+    if rates.size != states.size:
+        raise ValueError(f'func returned {rates.size} derivatives for {states.size} states')
 
-    boundUnit = 1
+    timeDims = times.dimsList()[0]
+    for rateDims, stateDims in zip(rates.dimsList(), states.dimsList()):
+        expected = tuple([i - j for i, j in zip(stateDims, timeDims)])
+        if rateDims != expected:
+            raise UnitException('solve_ivp', '%s / %s' % dimsToUnits(rateDims), '%s / %s' % dimsToUnits(expected))
+
+    #Raw dy/dt in its recorded units -> raw y units per raw t unit
+    rateScale = rates.scales() * times.scales()[0] / states.scales()
+    timeSignature = times.signatures[0]
+
+    def rawFunc(t, y):
+        if timeSignature != None:
+            t = UUU.fromDims(t, timeSignature[0], timeSignature[1])
+        return rates.toRaw(func(t, states.toUnits(y), *arguments), checkUnits) * rateScale
+
+    if isinstance(kwargs.get('t_eval'), ComplexUnits):
+        kwargs['t_eval'] = times.toRaw(kwargs['t_eval'], checkUnits = True)
+
+    sol = solve_ivp(rawFunc, (t0, t1), states.toRaw(y0), **kwargs)
+    sol.t = times.toUnits(sol.t[None, :])
+    sol.y = states.toUnits(sol.y)
+    return sol
 
-    if type(lowerBound) == type(UUU('')):
-        lowerBound = lowerBound.getNum()
-        upperBound = upperBound.getNum()
-        boundUnit = UUU(lowerBound.innerGunk.topUnit, lowerBound.innerGunk.bottomUnit)
 
-    def newFunc(x):
-        x = x * boundUnit
-        funcReturn = func(x, *arguments)
-        return funcReturn.getNum()
 
-    num = quad(newFunc, lowerBound, upperBound)[0]
-    return num * returnUnit
 
+def _plotValues(values, displayUnits):
+    "Returns (raw ndarray, unit label) for an array UUU, a list of UUU or plain numbers"
+    import numpy as np
 
+    if type(values) in (list, tuple) and len(values) > 0 and isinstance(values[0], ComplexUnits):
+        values = arrayU(values)
 
+    if not isinstance(values, ComplexUnits):
+        return np.asarray(values, dtype = float), ''
 
-def plot(X, Y, option = None, label = ''):
-    "Standard plt.plot that can handle functions that take/return units."
-    Xscalar = np.zeros(len(X))
-    xSample = X[0]
+    if displayUnits != None:
+        if type(displayUnits) == str:
+            displayUnits = (displayUnits, '')
+        values = UUU.fromDims(values.scalar, values.dims, values.units).convertTo(*displayUnits)
 
-    for i in range(len(X)):
-        Xscalar[i] = X[i].getNum()
+    return np.asarray(values.scalar, dtype = float), values.printUnits()
 
-    Yscalar = np.zeros(len(Y))
-    for i in range(len(Y)):
-        Yscalar[i] = Y[i].getNum()
 
-    ySample = Y[0]
-    Y = Yscalar
-    X = Xscalar
+def _minMaxDecimate(y, maxPoints):
+    "Returns sorted indices keeping the min and max of y in each of maxPoints/2 equal buckets"
+    import numpy as np
+
+    buckets = max(maxPoints // 2, 1)
+    size = -(-len(y) // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:len(y)] = y
+    padded = padded.reshape(buckets, size)
+
+    valid = ~np.all(np.isnan(padded), axis = 1)
+    padded = padded[valid]
+    offsets = np.arange(buckets)[valid] * size
+    keep = np.concatenate([offsets + np.nanargmin(padded, axis = 1), offsets + np.nanargmax(padded, axis = 1)])
+    return np.unique(keep)
+
+
+def plot(X, Y, option = None, label = '', xUnits = None, yUnits = None, maxPoints = None):
+    '''
+    Standard plt.plot that can handle functions that take/return units.
+    X and Y may be array-backed UUU, lists of UUU (checked and packed in one step) or numbers.
+
+    xUnits, yUnits= display units, a numerator string or (top, bottom) tuple, e.g. 'psi'
+    maxPoints= draw at most about this many points, keeping the min and max of Y in each
+               bucket so peaks survive decimation of long series
+    '''
+    import matplotlib.pyplot as plt
+
+    X, xLabel = _plotValues(X, xUnits)
+    Y, yLabel = _plotValues(Y, yUnits)
+
+    if maxPoints != None and len(Y) > maxPoints:
+        keep = _minMaxDecimate(Y, maxPoints)
+        X = X[keep]
+        Y = Y[keep]
+
     if option != None:
         plt.plot(X, Y, option, label = label)
     else:
         plt.plot(X,Y, label = label)
-    plt.xlabel(f"({xSample.printUnits()})")
-    plt.ylabel(f"({ySample.printUnits()})")
+    plt.xlabel(f"({xLabel})")
+    plt.ylabel(f"({yLabel})")
     plt.legend()
     return
 
+
+def _erasedOutput(value, spec):
+    "Attaches the recorded output units to the SI values a unit-erased call returned"
+    outputType, signatures = spec
+    items = value if outputType != None else [value]
+    if len(items) != len(signatures):
+        raise UnitException('unitChecked', f'{len(items)} outputs', f'{len(signatures)} outputs of the checked call')
+
+    results = []
+    for item, signature in zip(items, signatures):
+        if isinstance(item, ComplexUnits):
+            item = item.siScalar()
+        if signature == None:
+            results.append(item)
+        elif signature[1] == None:
+            results.append(UUU.fromDims(item, signature[0]))
+        else:
+            results.append(UUU.fromDims(item / signature[1][0], signature[0], signature[1]))
+
+    if outputType != None:
+        return outputType(results)
+    return results[0]
+
+
+def _sameValues(checked, erased):
+    import numpy as np
+
+    checked = checked if type(checked) in (list, tuple) else [checked]
+    erased = erased if type(erased) in (list, tuple) else [erased]
+    if len(checked) != len(erased):
+        return False
+    for i, j in zip(checked, erased):
+        i = i.siScalar() if isinstance(i, ComplexUnits) else i
+        j = j.siScalar() if isinstance(j, ComplexUnits) else j
+        if np.shape(i) != np.shape(j) or not np.allclose(i, j, rtol = 1e-9, atol = 0, equal_nan = True):
+            return False
+    return True
+
+
+def unitChecked(func):
+    '''
+    Decorator for functions whose output units depend only on the units of their inputs.
+    The first call with a given tuple of input unit signatures runs func on UUU with full
+    checking, records the output units and confirms that func gives the same SI values when
+    handed plain SI floats/ndarrays. Later calls with those signatures strip the units, run
+    func on the raw SI values and reattach the recorded output units.
+
+    Signatures whose unit-erased run raises or disagrees keep running with full checking; this
+    happens when func mixes its inputs with UUU constants (pass those as arguments instead).
+    Arguments that aren't UUU are part of the signature by value (e.g. an exponent), so every
+    distinct value is checked once; calls with an unhashable plain argument (a list, an ndarray)
+    always run with full checking.
+    The wrapper's signatures dict holds the cache and clearSignatures() empties it.
+    '''
+    from functools import wraps
+    signatures = {}
+    unhashable = object()
+
+    def signatureOf(value):
+        if isinstance(value, ComplexUnits):
+            return (value.dims, value.units)
+        return None
+
+    def keyOf(value):
+        if isinstance(value, ComplexUnits):
+            return (value.dims, value.units)
+        try:
+            hash(value)
+        except TypeError:
+            return unhashable
+        return (type(value), value)
+
+    def erase(value):
+        if isinstance(value, ComplexUnits):
+            return value.siScalar()
+        return value
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = tuple([keyOf(i) for i in args])
+        if kwargs:
+            key += tuple([(name, keyOf(kwargs[name])) for name in sorted(kwargs)])
+        if unhashable in key or any(i[1] is unhashable for i in key[len(args):]):
+            return func(*args, **kwargs)
+
+        spec = signatures.get(key)
+        if spec:
+            erasedArgs = [erase(i) for i in args]
+            erasedKwargs = {name: erase(value) for name, value in kwargs.items()}
+            return _erasedOutput(func(*erasedArgs, **erasedKwargs), spec)
+
+        checked = func(*args, **kwargs)
+        if spec is None:
+            outputType = type(checked) if type(checked) in (list, tuple) else None
+            items = checked if outputType != None else [checked]
+            spec = (outputType, [signatureOf(i) for i in items])
+            try:
+                erased = func(*[erase(i) for i in args], **{name: erase(value) for name, value in kwargs.items()})
+                if not _sameValues(checked, erased):
+                    spec = False
+            except Exception:
+                spec = False
+            signatures[key] = spec
+        return checked
+
+    wrapper.signatures = signatures
+    wrapper.clearSignatures = signatures.clear
+    return wrapper
+
+
+
+# Reductions Over Many Quantities
+# Units are checked once per element and the raw values are put on one
+# common factor (the shared display units, else SI) before a single
+# accumulation, instead of building a quantity per step.
+
+def _reductionValues(operation, quantities):
+    "Returns (dims, units, raw values) of a sequence of quantities or the elements of an array-backed UUU"
+    if isinstance(quantities, ComplexUnits):
+        import numpy as np
+        return quantities.dims, quantities.units, np.ravel(quantities.scalar)
+
+    quantities = list(quantities)
+    if not quantities:
+        raise ValueError(f'{operation} needs at least one quantity')
+    if not any(isinstance(i, ComplexUnits) for i in quantities):
+        return Dimensionless, None, quantities
+    return _matchingValues(operation, quantities)
+
+
+def _hasArrays(values):
+    return any(getattr(i, 'ndim', 0) > 0 for i in values)
+
+
+def _accumulate(values):
+    '''
+    Sums the raw values of a reduction: the elements of an array-backed UUU with NumPy's pairwise sum,
+    a list of ndarrays elementwise, and a list of floats correctly rounded with math.fsum
+    '''
+    import numpy as np
+    if isinstance(values, np.ndarray):
+        return np.sum(values)
+    if _hasArrays(values):
+        return np.sum(np.stack(np.broadcast_arrays(*values)), axis = 0)
+    from math import fsum
+    return fsum(values)
+
+
+def _extreme(values, largest):
+    "Largest (or smallest) raw value; lists of ndarrays reduce elementwise"
+    import numpy as np
+    if isinstance(values, np.ndarray):
+        return np.max(values) if largest else np.min(values)
+    if _hasArrays(values):
+        return (np.maximum if largest else np.minimum).reduce(np.broadcast_arrays(*values))
+    return max(values) if largest else min(values)
+
+
+def sumU(quantities):
+    '''
+    Sums a sequence of quantities that share dimensions (their display units may differ),
+    or every element of an array-backed UUU, into a single quantity.
+    Plain numbers may only be mixed with dimensionless quantities.
+    '''
+    dims, units, values = _reductionValues('Sum', quantities)
+    return UUU.fromDims(_accumulate(values), dims, units)
+
+
+def meanU(quantities):
+    "Mean of a sequence of quantities sharing dimensions, or of the elements of an array-backed UUU"
+    dims, units, values = _reductionValues('Mean', quantities)
+    return UUU.fromDims(_accumulate(values) / len(values), dims, units)
+
+
+def minU(quantities):
+    "Smallest of a sequence of quantities sharing dimensions, or of the elements of an array-backed UUU"
+    dims, units, values = _reductionValues('Min', quantities)
+    return UUU.fromDims(_extreme(values, largest = False), dims, units)
+
+
+def maxU(quantities):
+    "Largest of a sequence of quantities sharing dimensions, or of the elements of an array-backed UUU"
+    dims, units, values = _reductionValues('Max', quantities)
+    return UUU.fromDims(_extreme(values, largest = True), dims, units)
+
+
+def dotU(first, second):
+    '''
+    Sum of the products of two equally long sequences (or array-backed UUU). The entries of
+    each sequence must share dimensions; the result carries the product of the two.
+    e.g. dotU(massFlows, enthalpies) gives the enthalpy flow of a set of streams
+    '''
+    import numpy as np
+    firstDims, firstUnits, firstValues = _reductionValues('Dot', first)
+    secondDims, secondUnits, secondValues = _reductionValues('Dot', second)
+    if len(firstValues) != len(secondValues):
+        raise ValueError(f'dotU needs sequences of equal length, not {len(firstValues)} and {len(secondValues)}')
+
+    factor = (firstUnits[0] if firstUnits != None else 1) * (secondUnits[0] if secondUnits != None else 1)
+    dims = shareDims(tuple([i + j for i, j in zip(firstDims, secondDims)]))
+    if isinstance(firstValues, np.ndarray) and isinstance(secondValues, np.ndarray):
+        return UUU.fromDims(np.dot(firstValues, secondValues) * factor, dims)
+    return UUU.fromDims(_accumulate([i * j for i, j in zip(firstValues, secondValues)]) * factor, dims)
@@ -1,114 +1,158 @@
 #Unit and Other Variable Definitions
 
-from . import Database_Setup as _Database_Setup
 from . import ConversionTools as _ConversionTools
 from . import UnitClass as _UnitClass
+from .ConversionTools import UnitRegistry, DefaultRegistry
+from .BulkConversion import converter
 import os as _os
-import sys as _sys
 
-path = _os.path.realpath(__file__)
-path = path.split('/')
-path[-1] = "units.db"
+#Units Written to a New Database on First Use: (UnitName, UnitType, UnitValue)
+_DefaultUnits = [("g", "Mass", 1),
+                 ("mg", "Mass", 1000),
+                 ("kg", "Mass", 1000**-1),
+                 ("lb", "Mass", 453.592**-1),
+                 ("oz", "Mass", 453.592**-1*16),
+                 ("ton", "Mass", 453.592**-1/2000),
+                 ("amu", "Mass", 6.022e23),
+
+                 ("s", "time", 1),
+                 ("min", "time", 60**-1),
+                 ("h", "time", 3600**-1),
+                 ("d", "time", 3600**-1/24),
+                 ("y", "time", 3600**-1/24/3365),
+
+                 ('K', 'Temp', 1),
+                 ('R', 'Temp', 1.8),
+
+                 ('m', 'Length', 1),
+                 ('mm', 'Length', 1000),
+                 ('cm', 'Length', 100),
+                 ('km', 'Length', 1000**-1),
+                 ('in', 'Length', .0254**-1),
+                 ('mil', 'Length', 0.0254**-1*1000),
+                 ('ft', 'Length', 0.0254**-1/12),
+                 ('yd', 'Length', 0.0254**-1/12/3),
+                 ('mile', 'Length', 0.0254**-1/12/5280),
+
+                 ('Pa', "Pressure", 1),
+                 ('kPa', "Pressure", 1000**-1),
+                 ('MPa', "Pressure", 1e-6),
+                 ('GPa', "Pressure", 1e-9),
+                 ('torr', "Pressure", 0.00750062),
+                 ('mmHg', "Pressure", 0.00750062),
+                 ('bar', "Pressure", 1e-5),
+                 ('mbar', "Pressure", 1e-2),
+                 ('atm', "Pressure", 101325**-1),
+                 ('psi', "Pressure", 0.000145038),
+
+                 ('N', "Force", 1),
+                 ('lbf', "Force", 0.224809),
+
+                 ('J', "Energy", 1),
+                 ('kJ', "Energy", 1e-3),
+                 ('BTU', "Energy", 0.000947817),
+                 ('cal', "Energy", 0.239006),
+                 ('Cal', "Energy", 0.239006/1000),
+                 ('Wh', "Energy", 0.000277778),
+                 ('kWh', "Energy", 0.000277778/1000),
+                 ('eV', "Energy", 1.60218e-19**-1),
+
+                 ('W', "Power", 1),
+                 ('kW', "Power", 1e-3),
+                 ('MW', "Power", 1e-6),
+                 ('Horsepower', "Power", 0.00134102),
+
+                 ('L', "Vol", 1),
+                 ('mL', "Vol", 1000),
+                 ('gal', "Vol", 0.264172),
+                 ('quart', "Vol", 1.05669),
+                 ('cup', "Vol", 4.22675),
+                 ('pint', "Vol", 4.22675/2),
+                 ('Tbsp', "Vol", 67.628),
+                 ('tsp', "Vol", 202.884),
+
+                 ('mol', "Mole", 1),
+                 ('lbmol', "Mole", 453.592**-1)]
+
+_path = _os.path.realpath(__file__)
+_path = _path.split('/')
+_path[-1] = "units.db"
 _data_path = ""
-for _i in path:
+for _i in _path:
     _data_path += '/'+ _i
+_snapshot_path = _data_path[:-len('.db')] + '.snapshot'
 
-_needs_init = False
-if not _os.path.isfile(_data_path):
-    _needs_init = True
-    
-_db = _Database_Setup.myVars()
-
-if _needs_init:
-    _db.add("g", "Mass", 1)
-    _db.add("mg", "Mass", 1000)
-    _db.add("kg", "Mass", 1000**-1)
-    _db.add("lb", "Mass", 453.592**-1)
-    _db.add("oz", "Mass", 453.592**-1*16)
-    _db.add("ton", "Mass", 453.592**-1/2000)
-    _db.add("amu", "Mass", 6.022e23)
-
-    _db.add("s", "time", 1)
-    _db.add("min", "time", 60**-1)
-    _db.add("h", "time", 3600**-1)
-    _db.add("d", "time", 3600**-1/24)
-    _db.add("y", "time", 3600**-1/24/3365)
-
-    _db.add('K', 'Temp', 1)
-    _db.add('R', 'Temp', 1.8)
-
-    _db.add('m', 'Length', 1)
-    _db.add('mm', 'Length', 1000)
-    _db.add('cm', 'Length', 100)
-    _db.add('km', 'Length', 1000**-1)
-    _db.add('in', 'Length', .0254**-1)
-    _db.add('mil', 'Length', 0.0254**-1*1000)
-    _db.add('ft', 'Length', 0.0254**-1/12)
-    _db.add('yd', 'Length', 0.0254**-1/12/3)
-    _db.add('mile', 'Length', 0.0254**-1/12/5280)
-
-    _db.add('Pa', "Pressure", 1)
-    _db.add('kPa', "Pressure", 1000**-1)
-    _db.add('MPa', "Pressure", 1e-6)
-    _db.add('GPa', "Pressure", 1e-9)
-    _db.add('torr', "Pressure", 0.00750062)
-    _db.add('mmHg', "Pressure", 0.00750062)
-    _db.add('bar', "Pressure", 1e-5)
-    _db.add('mbar', "Pressure", 1e-2)
-    _db.add('atm', "Pressure", 101325**-1)
-    _db.add('psi', "Pressure", 0.000145038)
-
-    _db.add('N', "Force", 1)
-    _db.add('lbf', "Force", 0.224809)
-
-    _db.add('J', "Energy", 1)
-    _db.add('kJ', "Energy", 1e-3)
-    _db.add('BTU', "Energy", 0.000947817)
-    _db.add('cal', "Energy", 0.239006)
-    _db.add('Cal', "Energy", 0.239006/1000)
-    _db.add('Wh', "Energy", 0.000277778)
-    _db.add('kWh', "Energy", 0.000277778/1000)
-    _db.add('eV', "Energy", 1.60218e-19**-1)
-
-    _db.add('W', "Power", 1)
-    _db.add('kW', "Power", 1e-3)
-    _db.add('MW', "Power", 1e-6)
-    _db.add('Horsepower', "Power", 0.00134102)
-
-    _db.add('L', "Vol", 1)
-    _db.add('mL', "Vol", 1000)
-    _db.add('gal', "Vol", 0.264172)
-    _db.add('quart', "Vol", 1.05669)
-    _db.add('cup', "Vol", 4.22675)
-    _db.add('pint', "Vol", 4.22675/2)
-    _db.add('Tbsp', "Vol", 67.628)
-    _db.add('tsp', "Vol", 202.884)
-
-    _db.add('mol', "Mole", 1)
-    _db.add('lbmol', "Mole", 453.592**-1)
-
-_ScalingByType = {"Mass":_ConversionTools.MassToGrams,
-               "time":_ConversionTools.TimeToSec,
-               "Temp":_ConversionTools.TempToKel,
-               "Length":_ConversionTools.LengToMeter,
-               "Pressure":_ConversionTools.PressureToPa,
-               "Force":_ConversionTools.ForceToNewton,
-               "Energy":_ConversionTools.EnergyToJoule,
-               "Power":_ConversionTools.PowerToWatt,
-               "Vol":_ConversionTools.VolumeToLitre,
-               "Mole":_ConversionTools.MoleToMol}
-
-_AllVars = _db.loadUnitVariables()
-_currentmodule  = _sys.modules[__name__]  
+_db = None
 _unitNames = []
 
-for _var in _AllVars:
-    _ConversionTools.UnitType[_var[0]] = _var[1]
-    _ScalingByType[_var[1]][_var[0]] = _var[2]
-    _unitNames.append(_var[0])
 
-for _var in _AllVars:
-    setattr(_currentmodule, _var[0], _UnitClass.UUU(_var[0]))
+def _database():
+    "Opens units.db, writing the default units if it doesn't exist yet"
+    global _db
+    if _db is None:
+        from . import Database_Setup as _Database_Setup
+
+        needsInit = not _os.path.isfile(_data_path)
+        _db = _Database_Setup.myVars()
+        if needsInit:
+            _db.addMany(_DefaultUnits)
+    return _db
+
+
+def _saveSnapshot(units):
+    "Checkpoints the database's WAL, then snapshots the resolved tables"
+    from . import RegistrySnapshot as _RegistrySnapshot
+    _database().checkpoint()
+    return _RegistrySnapshot.writeSnapshot(_snapshot_path, _data_path, units, DefaultRegistry.tokens)
+
+
+def _loadUnits(registry):
+    "Fills the conversion tables from the snapshot, or from units.db when the snapshot is stale. Runs on the first unit lookup, not at import"
+    from . import RegistrySnapshot as _RegistrySnapshot
+
+    snapshot = _RegistrySnapshot.readSnapshot(_snapshot_path, _data_path)
+    if snapshot is not None:
+        units, tokens = snapshot
+        registry.loadTables(units, tokens)
+        _unitNames.extend([unit[0] for unit in units])
+        return
+
+    units = _database().loadUnitVariables()
+    registry.registerUnits(units)
+    _unitNames.extend([unit[0] for unit in units])
+    _saveSnapshot(units)
+
+DefaultRegistry.loader = _loadUnits
+
+if _os.environ.get('UNITANALYSIS_INSTRUMENT'):
+    from . import Instrumentation as _Instrumentation
+    _Instrumentation.enableFromEnvironment()
+
+
+def __getattr__(name):
+    "Builds unit objects such as atm or BTU the first time they are accessed"
+    if name.startswith('__'):
+        if name == '__all__':
+            return GetAllUnits() + ['AddNewUnit', 'AddNewUnits', 'GetAllUnits', 'BuildSnapshot', 'UnitRegistry', 'DefaultRegistry', 'converter']
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    #'from package import UnitFunctions' probes for the submodule first; that mustn't load the unit tables
+    from importlib.util import find_spec as _find_spec
+    if _find_spec(f'{__name__}.{name}') is not None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    DefaultRegistry.load()
+    if name not in _unitNames:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    unit = _UnitClass.UUU(name, registry = DefaultRegistry)
+    globals()[name] = unit
+    return unit
+
+
+def __dir__():
+    return sorted(set(globals()) | set(GetAllUnits()))
+
 
 def AddNewUnit(unitName, unitType, conversionFactor, replace = False):
     '''
@@ -137,13 +181,56 @@ def AddNewUnit(unitName, unitType, conversionFactor, replace = False):
         *It may be helpful to read the third argument as 1 lbs / 453.592 grams
     '''
 
-    _db.add(unitName, unitType, conversionFactor, replace)
-    _ConversionTools.UnitType[unitName] = unitType
-    _ScalingByType[unitType][unitName] = conversionFactor
-    _unitNames.append(unitName)
-    setattr(_currentmodule, unitName, _UnitClass.UUU(unitName))
+    AddNewUnits([(unitName, unitType, conversionFactor)], replace)
+
+
+def AddNewUnits(units, replace = False):
+    '''
+    Adds many units at once: one database transaction, one registry update and one snapshot write.
+    units = iterable of (unitName, unitType, conversionFactor), see AddNewUnit
+    replace= Set True to redefine pre- or previously defined units. Otherwise nothing is
+             added if any of the units already exists
+    Every unit is checked before anything is written, so a bad unitType or conversionFactor
+    raises ValueError and leaves the database untouched.
+    '''
+    from sqlite3 import IntegrityError as _IntegrityError
+
+    units = [tuple(unit) for unit in units]
+    for unitName, unitType, conversionFactor in units:
+        if unitType not in _ConversionTools.TypeDims:
+            raise ValueError(f"Error: {unitType!r} (for {unitName}) is not a unit type. Use one of {', '.join(_ConversionTools.TypeDims)}")
+
+    DefaultRegistry.load()
+    with DefaultRegistry.lock:
+        try:
+            DefaultRegistry.fork().registerUnits(units)
+        except (TypeError, ZeroDivisionError):
+            raise ValueError('Error: Every conversionFactor must be a nonzero number') from None
+
+        if replace:
+            _database().upsert(units)
+        else:
+            try:
+                _database().addMany(units)
+            except _IntegrityError:
+                names = [unit[0] for unit in units if unit[0] in _unitNames]
+                raise ValueError(f"Error: Does Unit {', '.join(names) or 'a repeated name'} already exist? Try the replace Flag")
+        DefaultRegistry.registerUnits(units)
+        for unit in units:
+            if unit[0] not in _unitNames:
+                _unitNames.append(unit[0])
+            globals().pop(unit[0], None)
+        _saveSnapshot(_database().loadUnitVariables())
+
+def BuildSnapshot():
+    "Writes units.snapshot from units.db so later imports can skip sqlite. Returns the snapshot path"
+    DefaultRegistry.load()
+    with DefaultRegistry.lock:
+        if not _saveSnapshot(_database().loadUnitVariables()):
+            raise OSError(f'Could not write {_snapshot_path}')
+    return _snapshot_path
 
 def GetAllUnits():
+    DefaultRegistry.load()
     return _unitNames
 
-__all__ = _unitNames+['AddNewUnit', 'GetAllUnits']
@@ -0,0 +1,52 @@
+'''
+Times a cold package import in fresh interpreters, with and without a
+first unit access (which loads the unit database).
+
+Usage:
+    python benchmarks/bench_import.py [runs]
+'''
+import os
+import statistics
+import subprocess
+import sys
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_name = os.path.basename(_root)
+
+_timed = '''
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+'''
+
+
+def timeImport(statement, runs, cwd = None, prepare = None):
+    '''
+    Returns the median seconds statement takes in a fresh interpreter
+    cwd= directory the interpreters start in, defaults to the one holding the package
+    prepare= called before every run, e.g. to delete the unit database
+    '''
+    times = []
+    for i in range(runs):
+        if prepare is not None:
+            prepare()
+        result = subprocess.run([sys.executable, '-c', _timed.format(statement = statement)],
+                                cwd = cwd or os.path.dirname(_root), capture_output = True, text = True, check = True)
+        times.append(float(result.stdout.split()[-1]))
+    return statistics.median(times)
+
+
+def main(runs = 20):
+    cases = {'import':                  f'import {_name}',
+             'import + atm':            f'import {_name}; {_name}.atm',
+             'import + UUU(J/mol K)':   f'import {_name}; {_name}.UnitClass.UUU("J", "mol*K")',
+             'numpy (reference)':       'import numpy'}
+
+    print(f'{"case":<24}{"median ms":>12}')
+    for name, statement in cases.items():
+        print(f'{name:<24}{timeImport(statement, runs)*1000:>12.2f}')
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:]])
@@ -0,0 +1,45 @@
+'''
+Measures the bytes held per live scalar quantity with tracemalloc.
+
+Usage:
+    python benchmarks/bench_memory.py [count]
+'''
+import importlib
+import os
+import sys
+import tracemalloc
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(_root))
+UnitAnalysis = importlib.import_module(os.path.basename(_root))
+UUU = UnitAnalysis.UnitClass.UUU
+
+
+def bytesPerQuantity(build, count):
+    "Returns the traced bytes per object for count objects made by build(i)"
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    quantities = [build(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    held = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    listBytes = sys.getsizeof(quantities)
+    return (held - listBytes) / count
+
+
+def main(count = 100000):
+    pressure = UUU('Pa')
+    energy = UUU('J', 'mol*K')
+    cases = {'UUU(\'Pa\', num=i)':       lambda i: UUU('Pa', num = float(i)),
+             'Pa * float':               lambda i: pressure * float(i),
+             'J/(mol K) * Pa':           lambda i: energy * pressure * float(i),
+             'float (reference)':        lambda i: float(i) + 0.5}
+
+    print(f'{"case":<24}{"bytes/quantity":>16}')
+    for name, build in cases.items():
+        print(f'{name:<24}{bytesPerQuantity(build, count):>16.1f}')
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:]])
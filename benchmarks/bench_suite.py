@@ -0,0 +1,252 @@
+'''
+Benchmark suite for the hot paths of the package. Every case reports
+operations per second and the transient bytes allocated per operation
+(tracemalloc peak above the starting level). Results can be saved as JSON
+and compared against an earlier run.
+
+Usage:
+    python benchmarks/bench_suite.py [--output results.json] [--compare old.json]
+                                     [--only name ...] [--seconds 0.2] [--import-runs 10]
+'''
+import argparse
+import gc
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_name = os.path.basename(_root)
+sys.path.insert(0, os.path.dirname(_root))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def opsPerSecond(operation, seconds):
+    "Returns the best ops/sec of operation() over 5 repeats of about seconds/5 each"
+    count = 1
+    while True:
+        start = time.perf_counter()
+        for i in range(count):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds / 25:
+            break
+        count *= 2
+
+    count = max(1, int(count * (seconds / 5) / elapsed))
+    best = float('inf')
+    gcWasOn = gc.isenabled()
+    gc.disable()
+    try:
+        for repeat in range(5):
+            start = time.perf_counter()
+            for i in range(count):
+                operation()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gcWasOn:
+            gc.enable()
+    return count / best
+
+
+def bytesPerOperation(operation, samples = 20):
+    "Returns the median transient bytes allocated by one call of operation()"
+    operation()
+    sizes = []
+    tracemalloc.start()
+    try:
+        for i in range(samples):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            operation()
+            sizes.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(sizes)
+
+
+def buildCases():
+    "Returns {name: operation} for every in-process case"
+    import numpy as np
+    from scipy.optimize import fsolve
+    from scipy.integrate import quad
+
+    package = importlib.import_module(_name)
+    UnitClass = importlib.import_module(f'{_name}.UnitClass')
+    UnitFunctions = importlib.import_module(f'{_name}.UnitFunctions')
+    molecularWeight = importlib.import_module(f'{_name}.molecularWeight')
+    UUU, Unit = UnitClass.UUU, UnitClass.Unit
+
+    pressure = UUU('Pa', num = 101325.0)
+    volume = UUU('m^3', num = 0.0224)
+    R = UUU('J', 'mol*K', num = 8.314)
+    temperature = UUU('K', num = 273.15)
+    pressures = UUU('Pa', num = np.linspace(1e5, 2e5, 1000))
+    formulas = ['H2O', 'CO2', 'CH4', 'C6H12O6', 'Ca(OH)2', 'CuSO4·5H2O', 'K4[Fe(CN)6]', 'NaCl'] * 125
+
+    def gasResidual(n):
+        return pressure * volume - n * R * temperature
+
+    def rawGasResidual(n):
+        return 101325.0 * 0.0224 - n * 8.314 * 273.15
+
+    def heatCapacity(T):
+        return R * (3.5 + T / UUU('K', num = 1000.0))
+
+    def rawHeatCapacity(T):
+        return 8.314 * (3.5 + T / 1000.0)
+
+    def uncachedMW():
+        molecularWeight.MW.cache_clear()
+        return molecularWeight.MW('K4[Fe(CN)6]')
+
+    streams = [UUU('kJ', 's', num = float(i)) for i in range(1000)]
+
+    def chainedSum():
+        total = streams[0]
+        for i in streams[1:]:
+            total = total + i
+        return total
+
+    guess = UUU('mol', num = 1.0)
+    lower, upper = UUU('K', num = 300.0), UUU('K', num = 500.0)
+
+    return {'UUU("J", "mol*K")':           lambda: UUU('J', 'mol*K'),
+            'UUU("kPa", num=x)':           lambda: UUU('kPa', num = 2.5),
+            'mul/div chain':               lambda: pressure * volume / (R * temperature),
+            'pow chain':                   lambda: (volume ** 2) ** 0.5 * pressure ** -1,
+            'array mul (1000)':            lambda: pressures * volume,
+            'convertTo kJ/mol':            lambda: (R * temperature).convertTo('kJ', 'mol'),
+            'Unit("atm")':                 lambda: Unit('atm'),
+            'Unit("psi", "kPa")':          lambda: Unit('psi', 'kPa'),
+            'package.atm':                 lambda: package.atm,
+            'fsolveU ideal gas':           lambda: UnitFunctions.fsolveU(gasResidual, guess),
+            'fsolve raw (reference)':      lambda: fsolve(rawGasResidual, 1.0),
+            'quadU Cp dT':                 lambda: UnitFunctions.quadU(heatCapacity, lower, upper),
+            'quad raw (reference)':        lambda: quad(rawHeatCapacity, 300.0, 500.0),
+            'sum 1000 UUU, chained +':     chainedSum,
+            'sumU 1000 UUU':               lambda: UnitFunctions.sumU(streams),
+            'np.sum 1000 UUU':             lambda: np.sum(streams),
+            'np.mean 1000 UUU':            lambda: np.mean(streams),
+            'MW cached':                   lambda: molecularWeight.MW('K4[Fe(CN)6]'),
+            'MW uncached':                 uncachedMW,
+            'MWMany (1000)':               lambda: molecularWeight.MWMany(formulas)}
+
+
+def checkResults():
+    "Asserts that the benchmarked NumPy paths give the right quantities before anything is timed"
+    import numpy as np
+
+    UUU = importlib.import_module(f'{_name}.UnitClass').UUU
+    lengths = [UUU('m', num = 1.0), UUU('m', num = 2.0)]
+    for name, result, expected in (('np.sum', np.sum(lengths), 3.0), ('np.mean', np.mean(lengths), 1.5)):
+        if not isinstance(result, UUU) or result.dims != lengths[0].dims or result.siScalar() != expected:
+            raise AssertionError(f'{name} over a list of UUU gave {result!r}, expected {expected} m')
+
+
+def coldImports(runs):
+    '''
+    Times cold imports with bench_import.timeImport against a private copy of the package,
+    so the unit database and snapshot can be deleted without touching the real ones.
+    Returns {name: median seconds}
+    '''
+    from bench_import import timeImport
+
+    scratch = tempfile.mkdtemp()
+    try:
+        copy = os.path.join(scratch, _name)
+        shutil.copytree(_root, copy, ignore = shutil.ignore_patterns('units.*', 'benchmarks', '.git'))
+        cases = {'cold import':                              ([], f'import {_name}'),
+                 'cold import + sqlite create':              (['units.db', 'units.db-wal', 'units.db-shm', 'units.snapshot'], f'import {_name}; {_name}.atm'),
+                 'cold import + sqlite load':                (['units.snapshot'], f'import {_name}; {_name}.atm'),
+                 'cold import + snapshot load':              ([], f'import {_name}; {_name}.atm')}
+
+        def remover(fileNames):
+            def prepare():
+                for fileName in fileNames:
+                    try:
+                        os.remove(os.path.join(copy, fileName))
+                    except FileNotFoundError:
+                        pass
+            return prepare
+
+        #Compiles the copied sources so no case pays for it
+        timeImport(f'import {_name}; {_name}.atm', 1, cwd = scratch)
+
+        return {name: timeImport(statement, runs, cwd = scratch, prepare = remover(fileNames))
+                for name, (fileNames, statement) in cases.items()}
+    finally:
+        shutil.rmtree(scratch, ignore_errors = True)
+
+
+def environment():
+    import numpy
+    import scipy
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = _root, capture_output = True,
+                                text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': numpy.__version__, 'scipy': scipy.__version__,
+            'commit': commit, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(results, old):
+    print(f'\n{"case":<32}{"old ops/s":>14}{"new ops/s":>14}{"ratio":>8}')
+    for name, new in results['cases'].items():
+        if name in old.get('cases', {}):
+            before = old['cases'][name]['ops_per_sec']
+            print(f'{name:<32}{before:>14.1f}{new["ops_per_sec"]:>14.1f}{new["ops_per_sec"]/before:>8.2f}')
+    for name, new in results['imports'].items():
+        if name in old.get('imports', {}):
+            before = old['imports'][name]
+            print(f'{name:<32}{before*1000:>12.2f}ms{new*1000:>12.2f}ms{before/new:>8.2f}')
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help = 'write the results to this JSON file')
+    parser.add_argument('--compare', help = 'JSON file from an earlier run to compare against')
+    parser.add_argument('--only', nargs = '*', help = 'only run cases whose name contains one of these')
+    parser.add_argument('--seconds', type = float, default = 0.2, help = 'timing budget per case')
+    parser.add_argument('--import-runs', type = int, default = 10, help = 'fresh interpreters per import case, 0 to skip')
+    arguments = parser.parse_args(argv)
+
+    checkResults()
+    cases = buildCases()
+    if arguments.only:
+        cases = {name: operation for name, operation in cases.items() if any(i in name for i in arguments.only)}
+
+    results = {'environment': environment(), 'cases': {}, 'imports': {}}
+    print(f'{"case":<32}{"ops/s":>14}{"bytes/op":>12}')
+    for name, operation in cases.items():
+        rate = opsPerSecond(operation, arguments.seconds)
+        allocated = bytesPerOperation(operation)
+        results['cases'][name] = {'ops_per_sec': rate, 'bytes_per_op': allocated}
+        print(f'{name:<32}{rate:>14.1f}{allocated:>12.0f}')
+
+    if arguments.import_runs > 0 and not arguments.only:
+        print(f'\n{"case":<32}{"median ms":>14}')
+        results['imports'] = coldImports(arguments.import_runs)
+        for name, seconds in results['imports'].items():
+            print(f'{name:<32}{seconds*1000:>14.2f}')
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent = 2)
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            compare(results, json.load(file))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -1,37 +1,96 @@
-MWElements = {'H':1.008,                                                                              
-              'He':4.0026,              'Li':6.94,   'Be':9.0122, 'B':10.81,   'C':12.011,  'N':14.007,  'O':15.99, 'F':18.998, 'Ne':20.180,              
-              'Na':22.990,              'Mg':24.305, 'Al':26.982, 'Si':28.085, 'P':30.974,  'S':32.06, 'Cl':35.45, 'Ar':39.948,              
-             'K' :39.098}
+from .UnitClass import UUU, unitSignature, shareDims
+from functools import lru_cache as _lru_cache
+import re as _re
 
+MWElements = {'H':1.008,                                                                                                                                                                                                              'He':4.0026,
+              'Li':6.94,   'Be':9.0122,                                                                                                                                         'B':10.81,   'C':12.011,  'N':14.007,  'O':15.999,  'F':18.998,  'Ne':20.180,
+              'Na':22.990, 'Mg':24.305,                                                                                                                                         'Al':26.982, 'Si':28.085, 'P':30.974,  'S':32.06,   'Cl':35.45,  'Ar':39.948,
+              'K':39.098,  'Ca':40.078, 'Sc':44.956,                                                                'Ti':47.867, 'V':50.942,  'Cr':51.996, 'Mn':54.938, 'Fe':55.845, 'Co':58.933, 'Ni':58.693, 'Cu':63.546, 'Zn':65.38,  'Ga':69.723, 'Ge':72.630, 'As':74.922, 'Se':78.971, 'Br':79.904, 'Kr':83.798,
+              'Rb':85.468, 'Sr':87.62,  'Y':88.906,                                                                 'Zr':91.224, 'Nb':92.906, 'Mo':95.95,  'Tc':98.0,   'Ru':101.07, 'Rh':102.91, 'Pd':106.42, 'Ag':107.87, 'Cd':112.41, 'In':114.82, 'Sn':118.71, 'Sb':121.76, 'Te':127.60, 'I':126.90,  'Xe':131.29,
+              'Cs':132.91, 'Ba':137.33, 'La':138.91, 'Ce':140.12, 'Pr':140.91, 'Nd':144.24, 'Pm':145.0,  'Sm':150.36, 'Eu':151.96, 'Gd':157.25, 'Tb':158.93, 'Dy':162.50, 'Ho':164.93, 'Er':167.26, 'Tm':168.93, 'Yb':173.05, 'Lu':174.97,
+                                                                                                                    'Hf':178.49, 'Ta':180.95, 'W':183.84,  'Re':186.21, 'Os':190.23, 'Ir':192.22, 'Pt':195.08, 'Au':196.97, 'Hg':200.59, 'Tl':204.38, 'Pb':207.2,  'Bi':208.98, 'Po':209.0,  'At':210.0,  'Rn':222.0,
+              'Fr':223.0,  'Ra':226.0,  'Ac':227.0,  'Th':232.04, 'Pa':231.04, 'U':238.03,  'Np':237.0,  'Pu':244.0,  'Am':243.0,  'Cm':247.0,  'Bk':247.0,  'Cf':251.0,  'Es':252.0,  'Fm':257.0,  'Md':258.0,  'No':259.0,  'Lr':266.0,
+                                                                                                                    'Rf':267.0,  'Db':268.0,  'Sg':269.0,  'Bh':270.0,  'Hs':277.0,  'Mt':278.0,  'Ds':281.0,  'Rg':282.0,  'Cn':285.0,  'Nh':286.0,  'Fl':289.0,  'Mc':290.0,  'Lv':293.0,  'Ts':294.0,  'Og':294.0}
+
+#Element, Count, Opening Bracket, Closing Bracket, Anything Else (an error)
+_FormulaToken = _re.compile(r'([A-Z][a-z]?)|(\d+)|([(\[])|([)\]])|(\S)')
+
+#Hydrates and Adducts, e.g. CuSO4·5H2O, CuSO4*5H2O or CuSO4.H2O
+_HydrateDot = _re.compile(r'[·•.*]')
+
+#A '.' between digits reads as a decimal count (Fe0.5O), so it can't start a coefficient; use · or * there
+_DecimalCount = _re.compile(r'\d\.\d')
+
+MWCacheSize = 4096
+
+
+def _groupWeight(formula):
+    "Weight of a formula without hydrate dots, e.g. Ca(OH)2 or K4[Fe(CN)6]"
+    stack = [0]
+    last = None
+    for element, count, opening, closing, other in _FormulaToken.findall(formula):
+        if element:
+            if element not in MWElements:
+                raise ValueError(f'Unknown element {element} in {formula}')
+            last = MWElements[element]
+            stack[-1] += last
+        elif count:
+            if last is None:
+                raise ValueError(f'Count without an element or group in {formula}')
+            if int(count) == 0:
+                raise ValueError(f'Zero count in {formula}')
+            stack[-1] += last * (int(count) - 1)
+            last = None
+        elif opening:
+            stack.append(0)
+            last = None
+        elif closing:
+            if len(stack) == 1:
+                raise ValueError(f'Unbalanced brackets in {formula}')
+            last = stack.pop()
+            stack[-1] += last
+        else:
+            raise ValueError(f'Unexpected character {other} in {formula}')
+
+    if len(stack) != 1:
+        raise ValueError(f'Unbalanced brackets in {formula}')
+    return stack[0]
+
+
+@_lru_cache(maxsize = MWCacheSize)
 def MW(CFormula):
-    
+    "Molecular weight in g/mol. Supports brackets and hydrate dots, e.g. Ca(OH)2 or CuSO4·5H2O"
+    if _DecimalCount.search(CFormula):
+        raise ValueError(f'Decimal count in {CFormula}; write hydrates with a coefficient as CuSO4·5H2O or CuSO4*5H2O')
     weight = 0
-    for i in range(len(CFormula)):
-        if (CFormula[i].isdigit() or CFormula[i].islower()):
-            continue
-        else:
-            if i == len(CFormula)-1 and CFormula[i].isupper():
-                weight += MWElements[CFormula[i]]
-                continue
-            
-            if CFormula[i+1].islower():
-                k = 1
-            else:
-                k = 0
-            
-            j = i + k + 1
-            while ((j) < len(CFormula) and CFormula[j].isdigit()):
-                j += 1
-            
-            
-            if (i+k+1) == j:
-                n = 1
-            else:
-                n = CFormula[i+k+1:j]
-                
-            weight += int(n) * MWElements[CFormula[i:i+k+1]]
-            
+    for part in _HydrateDot.split(CFormula):
+        coefficient = _re.match(r'\d*', part).group()
+        if not part[len(coefficient):].strip():
+            raise ValueError(f'Empty formula part in {CFormula}')
+        if coefficient and int(coefficient) == 0:
+            raise ValueError(f'Zero coefficient in {CFormula}')
+        weight += int(coefficient or 1) * _groupWeight(part[len(coefficient):])
     return weight
 
+
+def _gramsPerMol():
+    dims, factor = unitSignature('g', 'mol')
+    return shareDims(dims), factor
+
+
 def MWU(chemFormula):
-        return MW(chemFormula) * UUU('g','mol')
+    dims, factor = _gramsPerMol()
+    return UUU.fromDims(MW(chemFormula) * factor, dims)
+
+
+def MWMany(formulas):
+    "Returns an ndarray of molecular weights in g/mol. Repeated formulas are served from the MW cache"
+    import numpy as np
+    count = len(formulas) if hasattr(formulas, '__len__') else -1
+    return np.fromiter((MW(i) for i in formulas), dtype = float, count = count)
+
+
+def MWManyU(formulas):
+    "MWMany as a single array-backed UUU sharing one g/mol unit signature"
+    dims, factor = _gramsPerMol()
+    return UUU.fromDims(MWMany(formulas) * factor, dims)